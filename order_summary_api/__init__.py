@@ -1,3 +1,4 @@
 # order_summary_api/__init__.py
 from . import controllers
-from . import models
\ No newline at end of file
+from . import models
+from .hooks import post_init_hook
\ No newline at end of file
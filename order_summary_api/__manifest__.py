@@ -1,7 +1,7 @@
 # order_summary_api/__manifest__.py
 {
     'name': 'Order Summary API',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'summary': 'Provides a high-performance API for order summaries with real-time updates.',
     'author': 'ALFATIH MOHAMED',
     'category': 'Extra Tools',
@@ -11,8 +11,12 @@
         'stock',
         'mrp',
     ],
+    'external_dependencies': {
+        'python': ['PyJWT', 'websockets'],
+    },
     'data': [
-        # 'security/ir.model.access.csv',
+        'security/ir.model.access.csv',
+        'data/ir_cron.xml',
         'views/order_summary_menu.xml',
     ],
     'assets': {
@@ -21,6 +25,7 @@
             'order_summary_api/static/src/xml/templates.xml',
         ],
     },
+    'post_init_hook': 'post_init_hook',
     'installable': True,
     'application': False,
     'auto_install': False,
@@ -1,2 +1,3 @@
 # order_summary_api/controllers/__init__.py
-from . import api_controller
\ No newline at end of file
+from . import api_controller
+from . import websocket_controller
\ No newline at end of file
@@ -1,15 +1,89 @@
 # order_summary_api/controllers/api_controller.py
 import jwt
+import csv
+import io
 import time
 import json
 import logging
+from contextlib import nullcontext
 from functools import wraps
 
-from odoo import http
+from psycopg2 import errors
+
+from odoo import fields, http
+from odoo.exceptions import AccessDenied
 from odoo.http import request, Response
 
+from odoo.addons.order_summary_api.models.order_summary_line import SUMMARY_GROUP_LEVELS
+from odoo.addons.order_summary_api.tools import (
+    LEGACY_JWT_KID, OrderSummaryDispatcher, PhaseTimer, SummaryBusy, jwt_verifier, summary_cache, summary_encoding,
+    summary_gate, summary_metrics,
+)
+from odoo.addons.order_summary_api.tools.summary_gate import DEFAULT_MAX_HEAVY_QUERIES, DEFAULT_QUEUE_TIMEOUT_MS
+from odoo.addons.order_summary_api.tools.summary_metrics import (
+    CACHE_LOOKUPS, PHASE_DURATION, REQUEST_DURATION, REQUESTS, ROWS,
+)
+
 _logger = logging.getLogger(__name__)
 
+# Lifetime of access tokens, in seconds; refresh tokens renew them.
+ACCESS_TOKEN_TTL = 3600
+# Upper bound for the ``limit`` query parameter of the paginated endpoint.
+MAX_PAGE_SIZE = 10000
+# Default of the order_summary_api.max_batch_size system parameter: the
+# number of filter sets accepted by one batch request.
+DEFAULT_MAX_BATCH_SIZE = 500
+# Default of the order_summary_api.max_batch_rows system parameter: the
+# number of rows one batch request may return across all its filter sets.
+DEFAULT_MAX_BATCH_ROWS = 200000
+# Default of the order_summary_api.cache_max_mb system parameter: the size
+# of the response cache of each worker process, in megabytes.
+DEFAULT_CACHE_MAX_MB = 16
+# Rows fetched from the server-side cursor per chunk in streaming mode.
+STREAM_BATCH_SIZE = 2000
+# Requests without a template filter and without a page of at most this
+# many rows are heavy, and go through admission control.
+HEAVY_PAGE_SIZE = 1000
+STREAM_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+SUMMARY_COLUMNS = [
+    'template_id', 'template_name', 'product_id', 'default_code',
+    'ordered_quantity', 'manufactured_quantity', 'delivered_quantity',
+]
+
+
+# --- Instrumentation ---
+
+def instrumented(f):
+    """
+    Decorator timing an endpoint: its phases are returned in a Server-Timing
+    header and, with the overall latency and status, added to the metrics,
+    which are flushed to the database every now and then.
+    """
+
+    @wraps(f)
+    def decorated(self, *args, **kwargs):
+        timer = request.summary_timer = PhaseTimer()
+        response = f(self, *args, **kwargs)
+        endpoint = f.__name__
+        REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+        REQUEST_DURATION.observe(timer.elapsed(), endpoint=endpoint)
+        for phase, seconds in timer.phases.items():
+            PHASE_DURATION.observe(seconds, endpoint=endpoint, phase=phase)
+        response.headers['Server-Timing'] = timer.server_timing()
+        summary_metrics.maybe_flush(request.env.registry, gauges=OrderSummaryDispatcher.is_leader)
+        return response
+
+    return decorated
+
+
+def _phase(name):
+    """Times a phase of the current request, if it is instrumented."""
+    timer = getattr(request, 'summary_timer', None)
+    return timer.phase(name) if timer else nullcontext()
+
 
 # --- JWT Security Layer ---
 
@@ -18,9 +92,47 @@ class AuthError(Exception):
     pass
 
 
-def _get_jwt_secret():
-    """Helper to get the JWT secret from system parameters for security."""
-    return request.env['ir.config_parameter'].sudo().get_param('order_summary_api.jwt_secret')
+def _parse_ids(value):
+    """Ids from a JSON list or a comma separated query string value, brackets allowed."""
+    if isinstance(value, list):
+        return [int(i) for i in value]
+    return [int(i) for i in value.strip('[]').split(',') if i]
+
+
+def _strict_ids(value):
+    """Ids from an optional JSON list of integers; anything else raises TypeError."""
+    if not value:
+        return []
+    if not isinstance(value, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in value):
+        raise TypeError(value)
+    return value
+
+
+def _valid_body_value(key, value):
+    """Whether a POSTed filter has a type its query string parsing accepts."""
+    if value is None or isinstance(value, str):
+        return True
+    if key in ('delivery_ids', 'product_templates', 'company_ids'):
+        return isinstance(value, list) and all(isinstance(i, (int, str)) and not isinstance(i, bool) for i in value)
+    if key == 'group_by':
+        return isinstance(value, list) and all(isinstance(level, str) for level in value)
+    if key in ('limit', 'after'):
+        return isinstance(value, int) and not isinstance(value, bool)
+    # Strings only: format, layout, dates; unknown keys are ignored as in the query string.
+    return key not in ('format', 'layout', 'date_from', 'date_to')
+
+
+def _get_jwt_keys():
+    """Helper to get the JWT keys ({kid: secret}, active kid) from the cached system parameters."""
+    return request.env['ir.config_parameter'].sudo()._get_order_summary_jwt_keys()
+
+
+def _get_jwt_signing_key():
+    """Returns the (kid, secret) used to sign new tokens, or (None, None) if not configured."""
+    keys, active_kid = _get_jwt_keys()
+    if not active_kid:
+        return None, None
+    return active_kid, keys[active_kid]
 
 
 def jwt_required(f):
@@ -39,13 +151,16 @@ def jwt_required(f):
                 raise AuthError('Invalid token format. Expected "Bearer <token>".')
 
             token = token_parts[1]
-            secret = _get_jwt_secret()
-            if not secret:
-                _logger.error("JWT secret ('order_summary_api.jwt_secret') is not configured in system parameters.")
+            keys, active_kid = _get_jwt_keys()
+            if not keys:
+                _logger.error("No JWT key ('order_summary_api.jwt_secret' or 'order_summary_api.jwt_keys') "
+                              "is configured in system parameters.")
                 return Response(json.dumps({'error': 'Server is not configured for JWT authentication.'}), status=500,
                                 content_type='application/json')
 
-            payload = jwt.decode(token, secret, algorithms=["HS256"])
+            # Tokens issued before key ids were introduced carry no kid header.
+            with _phase('auth'):
+                payload = jwt_verifier.verify(request.env.cr.dbname, token, keys, default_kid=LEGACY_JWT_KID)
             request.jwt_payload = payload
 
         except jwt.ExpiredSignatureError:
@@ -66,87 +181,123 @@ def jwt_required(f):
 
 class OrderSummaryAPI(http.Controller):
 
-    def _get_order_summary_data(self, product_template_ids=None, delivery_ids=None):
+    def _issue_tokens(self, uid, db, refresh_token=None):
         """
-        Computes order summary data using a single, optimized SQL query.
-        This approach is significantly faster for large datasets than using the ORM.
+        Signs a short-lived access token for ``uid`` and returns the JSON
+        response carrying it, together with ``refresh_token`` (a new refresh
+        token is issued when none is given). Returns an error response when
+        no signing key is configured.
         """
-        query = """
-            WITH product_scope AS (
-                SELECT
-                    pp.id AS product_id,
-                    pt.id AS template_id,
-                    pt.name AS template_name,
-                    pp.default_code
-                FROM
-                    product_product pp
-                JOIN
-                    product_template pt ON (pp.product_tmpl_id = pt.id)
-                {where_clause_products}
-            ),
-            ordered_qty AS (
-                SELECT
-                    sol.product_id,
-                    SUM(sol.product_uom_qty) AS quantity
-                FROM
-                    sale_order_line sol
-                WHERE sol.product_id IN (SELECT product_id FROM product_scope)
-                GROUP BY sol.product_id
-            ),
-            manufactured_qty AS (
-                SELECT
-                    mp.product_id,
-                    SUM(mp.product_qty) AS quantity
-                FROM
-                    mrp_production mp
-                WHERE mp.product_id IN (SELECT product_id FROM product_scope) AND mp.state = 'done'
-                GROUP BY mp.product_id
-            ),
-            delivered_qty AS (
-                SELECT
-                    sm.product_id,
-                    SUM(sm.quantity_done) AS quantity
-                FROM
-                    stock_move sm
-                JOIN
-                    stock_picking sp ON (sm.picking_id = sp.id)
-                WHERE sm.product_id IN (SELECT product_id FROM product_scope)
-                  AND sm.state = 'done'
-                  AND sp.picking_type_code = 'outgoing'
-                  {where_clause_deliveries}
-                GROUP BY sm.product_id
-            )
-            SELECT
-                ps.template_id,
-                ps.template_name,
-                ps.product_id,
-                ps.default_code,
-                COALESCE(oq.quantity, 0) AS ordered_quantity,
-                COALESCE(mq.quantity, 0) AS manufactured_quantity,
-                COALESCE(dq.quantity, 0) AS delivered_quantity
-            FROM
-                product_scope ps
-            LEFT JOIN ordered_qty oq ON (ps.product_id = oq.product_id)
-            LEFT JOIN manufactured_qty mq ON (ps.product_id = mq.product_id)
-            LEFT JOIN delivered_qty dq ON (ps.product_id = dq.product_id)
-            ORDER BY ps.template_name, ps.default_code;
+        kid, secret = _get_jwt_signing_key()
+        if not secret:
+            _logger.error("No active JWT signing key ('order_summary_api.jwt_active_kid') is configured.")
+            return Response(json.dumps({'error': 'JWT authentication is not configured on the server.'}), status=500,
+                            content_type='application/json')
+
+        payload = {
+            'uid': uid,
+            'exp': time.time() + ACCESS_TOKEN_TTL,
+            'iat': time.time(),
+            'db': db,
+        }
+        token = jwt.encode(payload, secret, algorithm="HS256", headers={'kid': kid})
+        if refresh_token is None:
+            refresh_token = request.env['order.summary.refresh.token'].sudo()._issue(uid)
+
+        return Response(json.dumps({
+            'token': token,
+            'expires_in': ACCESS_TOKEN_TTL,
+            'refresh_token': refresh_token,
+        }), status=200, content_type='application/json')
+
+    def _get_refresh_token_param(self):
+        try:
+            return json.loads(request.httprequest.data).get('refresh_token')
+        except Exception:
+            return None
+
+    def _get_order_summary_data(self, summary, product_template_ids=None, delivery_ids=None, after=None, limit=None,
+                                group_by=None, **period):
         """
-        where_clauses = {'products': "", 'deliveries': ""}
-        params = {}
-
-        if product_template_ids:
-            where_clauses['products'] = "WHERE pt.id IN %(template_ids)s"
-            params['template_ids'] = tuple(product_template_ids)
-        if delivery_ids:
-            where_clauses['deliveries'] = "AND sm.picking_id IN %(delivery_ids)s"
-            params['delivery_ids'] = tuple(delivery_ids)
-
-        final_query = query.format(
-            where_clause_products=where_clauses['products'],
-            where_clause_deliveries=where_clauses['deliveries']
+        Reads order summary data, through the cursor of ``summary``, from
+        the incrementally maintained order.summary.line table instead of
+        aggregating the full history. With ``group_by`` levels other than the
+        plain variant list, the rows are rolled up in the database instead.
+        ``period`` (date_from, date_to, company_ids) switches to the daily
+        pre-aggregates.
+        """
+        if group_by and group_by != ['variant']:
+            return summary._read_grouped_summary(
+                group_by,
+                product_template_ids=product_template_ids,
+                delivery_ids=delivery_ids,
+                **period,
+            )
+        return summary._read_summary(
+            product_template_ids=product_template_ids,
+            delivery_ids=delivery_ids,
+            after=after,
+            limit=limit,
+            **period,
         )
-        request.env.cr.execute(final_query, params)
-        return request.env.cr.dictfetchall()
+
+    def _get_admission_limits(self):
+        """Returns the admission control settings, as keyword arguments of summary_gate."""
+        get_param = request.env['ir.config_parameter'].sudo().get_param
+        return {
+            'max_heavy': int(get_param('order_summary_api.max_heavy_queries', DEFAULT_MAX_HEAVY_QUERIES)),
+            'queue_timeout': int(get_param('order_summary_api.queue_timeout_ms', DEFAULT_QUEUE_TIMEOUT_MS)) / 1000.0,
+        }
+
+    def _busy_response(self, queue_timeout):
+        return Response(json.dumps({'error': 'The order summary is busy, please retry later.'}), status=503,
+                        content_type='application/json',
+                        headers={'Retry-After': str(max(int(queue_timeout), 1))})
+
+    def _stream_order_summary(self, output_format, product_template_ids=None, delivery_ids=None, **period):
+        """
+        Returns the summary as an iterator of NDJSON or CSV chunks, one chunk
+        per cursor batch. The chunks are produced after the handler has
+        returned, so everything bound to the request is resolved here, and
+        the first chunk is produced right away: failing to get an execution
+        slot or to run the query raises here, while an error response can
+        still be sent, instead of aborting a response already started.
+        """
+        summary = request.env['order.summary.line'].sudo()
+        limits = self._get_admission_limits()
+
+        def chunks():
+            # The execution slot is held for as long as the cursor is read.
+            with summary_gate.admit(summary.env.registry, heavy=not product_template_ids, **limits):
+                batches = summary._stream_summary(
+                    product_template_ids=product_template_ids,
+                    delivery_ids=delivery_ids,
+                    batch_size=STREAM_BATCH_SIZE,
+                    **period,
+                )
+                if output_format == 'csv':
+                    buffer = io.StringIO()
+                    writer = csv.DictWriter(buffer, fieldnames=SUMMARY_COLUMNS, extrasaction='ignore')
+                    writer.writeheader()
+                    for rows in batches:
+                        writer.writerows(rows)
+                        yield buffer.getvalue().encode()
+                        buffer.seek(0)
+                        buffer.truncate()
+                    yield buffer.getvalue().encode()
+                else:
+                    for rows in batches:
+                        yield ''.join(json.dumps(row, default=str) + '\n' for row in rows).encode()
+
+        stream = chunks()
+        first = next(stream, b'')
+
+        def primed():
+            # Delegating keeps closing the response iterator closing the stream.
+            yield first
+            yield from stream
+
+        return primed()
 
     # @http.route('/api/v1/login', type='json', auth='none', methods=['POST'], csrf=False)
     # def login(self, **kwargs):
@@ -209,49 +360,363 @@ class OrderSummaryAPI(http.Controller):
             return Response(json.dumps({'error': 'Authentication failed no uid.'}), status=401,
                             content_type='application/json')
 
-        secret = _get_jwt_secret()
-        if not secret:
-            _logger.error("JWT secret ('order_summary_api.jwt_secret') is not configured.")
+        return self._issue_tokens(uid, db)
+
+    @http.route('/api/v1/token/refresh', type='http', auth='none', methods=['POST'], csrf=False)
+    def refresh_token(self, **kwargs):
+        """
+        Exchanges a refresh token for a new access token without password
+        verification. The refresh token is rotated: the one presented is
+        revoked and a new one is returned.
+        """
+        raw_token = self._get_refresh_token_param()
+        if not raw_token:
+            return Response(json.dumps({'error': 'refresh_token is required.'}), status=400,
+                            content_type='application/json')
+        if not _get_jwt_signing_key()[1]:
+            # Do not consume the refresh token if no access token can be signed.
             return Response(json.dumps({'error': 'JWT authentication is not configured on the server.'}), status=500,
                             content_type='application/json')
 
-        payload = {
-            'uid': uid,
-            'exp': time.time() + 3600,  # Expires in 1 hour
-            'iat': time.time(),
-            'db': db,
-        }
-        token = jwt.encode(payload, secret, algorithm="HS256")
+        try:
+            user, new_refresh_token = request.env['order.summary.refresh.token'].sudo()._rotate(raw_token)
+        except AccessDenied:
+            return Response(json.dumps({'error': 'Invalid or expired refresh token.'}), status=401,
+                            content_type='application/json')
 
-        return Response(json.dumps({'token': token}), status=200, content_type='application/json')
+        return self._issue_tokens(user.id, request.env.cr.dbname, refresh_token=new_refresh_token)
+
+    @http.route('/api/v1/token/revoke', type='http', auth='none', methods=['POST'], csrf=False)
+    def revoke_token(self, **kwargs):
+        """Revokes a refresh token and every token rotated from the same login."""
+        raw_token = self._get_refresh_token_param()
+        if not raw_token:
+            return Response(json.dumps({'error': 'refresh_token is required.'}), status=400,
+                            content_type='application/json')
 
+        request.env['order.summary.refresh.token'].sudo()._revoke(raw_token)
+        return Response(json.dumps({'revoked': True}), status=200, content_type='application/json')
 
-    @http.route('/api/v1/order-summary', type='http', auth='none', methods=['GET'], csrf=False)
+    @http.route('/api/v1/order-summary', type='http', auth='none', methods=['GET', 'POST'], csrf=False)
+    @instrumented
     @jwt_required
     def get_order_summary(self, **kwargs):
-        """Protected endpoint for fetching summary data, with optional filters."""
+        """
+        Protected endpoint for fetching summary data, with optional filters.
+
+        Filters too large for a URL can be POSTed instead, as a JSON object
+        with the same keys as the query string and id lists as arrays, e.g.
+        ``{"delivery_ids": [...], "product_templates": [...]}``; its values
+        take precedence over the query string.
+        """
+        if request.httprequest.method == 'POST':
+            try:
+                body = json.loads(request.httprequest.data or b'{}')
+                if not isinstance(body, dict):
+                    raise TypeError(body)
+            except (ValueError, TypeError):
+                return Response(json.dumps({'error': 'Invalid JSON body, expected an object of filters'}),
+                                status=400, content_type='application/json')
+            invalid = sorted(key for key, value in body.items() if not _valid_body_value(key, value))
+            if invalid:
+                return Response(json.dumps({'error': f'Invalid value type for {", ".join(invalid)}'}),
+                                status=400, content_type='application/json')
+            kwargs = dict(kwargs, **body)
+
         delivery_ids = []
         if 'delivery_ids' in kwargs and kwargs['delivery_ids']:
             try:
-                delivery_ids = [int(i) for i in kwargs['delivery_ids'].strip('[]').split(',') if i]
-            except (ValueError, TypeError):
+                delivery_ids = _parse_ids(kwargs['delivery_ids'])
+            except (ValueError, TypeError, AttributeError):
                 return Response(json.dumps({'error': 'Invalid format for delivery_ids'}), status=400,
                                 content_type='application/json')
 
         product_templates = []
         if 'product_templates' in kwargs and kwargs['product_templates']:
             try:
-                product_templates = [int(i) for i in kwargs['product_templates'].strip('[]').split(',') if i]
-            except (ValueError, TypeError):
+                product_templates = _parse_ids(kwargs['product_templates'])
+            except (ValueError, TypeError, AttributeError):
                 return Response(json.dumps({'error': 'Invalid format for product_templates'}), status=400,
                                 content_type='application/json')
 
+        company_ids = []
+        if 'company_ids' in kwargs and kwargs['company_ids']:
+            try:
+                company_ids = _parse_ids(kwargs['company_ids'])
+            except (ValueError, TypeError, AttributeError):
+                return Response(json.dumps({'error': 'Invalid format for company_ids'}), status=400,
+                                content_type='application/json')
+
         try:
-            data = self._get_order_summary_data(
-                product_template_ids=product_templates or None,
-                delivery_ids=delivery_ids or None
-            )
-            return Response(json.dumps(data, default=str), status=200, content_type='application/json')
+            date_from = fields.Date.to_date(kwargs.get('date_from') or None)
+            date_to = fields.Date.to_date(kwargs.get('date_to') or None)
+        except (ValueError, TypeError):
+            return Response(json.dumps({'error': 'Invalid format for date_from or date_to, expected YYYY-MM-DD'}),
+                            status=400, content_type='application/json')
+        if date_from and date_to and date_from > date_to:
+            return Response(json.dumps({'error': 'date_from must not be after date_to'}), status=400,
+                            content_type='application/json')
+        period = {'date_from': date_from, 'date_to': date_to, 'company_ids': company_ids or None}
+
+        # An explicit format wins over the Accept header.
+        output_format = kwargs.get('format') or summary_encoding.negotiate_format(
+            request.httprequest.accept_mimetypes)
+        if output_format not in summary_encoding.MEDIA_TYPES and output_format not in STREAM_CONTENT_TYPES:
+            return Response(json.dumps({'error': 'Invalid format, expected json, msgpack, ndjson or csv'}), status=400,
+                            content_type='application/json')
+        if output_format not in summary_encoding.available_formats() and output_format not in STREAM_CONTENT_TYPES:
+            return Response(json.dumps({'error': f'The {output_format} format is not available on this server'}),
+                            status=406, content_type='application/json')
+        layout = kwargs.get('layout') or 'rows'
+        if layout not in summary_encoding.LAYOUTS or (layout != 'rows' and output_format in STREAM_CONTENT_TYPES):
+            return Response(json.dumps({'error': 'Invalid layout, expected rows or columns (not streamed)'}),
+                            status=400, content_type='application/json')
+
+        try:
+            limit = int(kwargs['limit']) if kwargs.get('limit') else None
+            after = int(kwargs['after']) if kwargs.get('after') else None
+        except (ValueError, TypeError):
+            return Response(json.dumps({'error': 'Invalid format for limit or after'}), status=400,
+                            content_type='application/json')
+        if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+            return Response(json.dumps({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), status=400,
+                            content_type='application/json')
+        # The keyset is the sort key of that product: without it, the page
+        # would come back empty, as if the summary ended there.
+        if after is not None and not request.env['product.product'].sudo().browse(after).exists():
+            return Response(json.dumps({'error': f'Unknown product {after} for after; restart from the first page'}),
+                            status=400, content_type='application/json')
+
+        group_by = kwargs.get('group_by') or 'variant'
+        if isinstance(group_by, list):
+            group_by = ','.join(map(str, group_by))
+        group_by = [level.strip() for level in group_by.split(',') if level.strip()]
+        if not group_by or set(group_by) - set(SUMMARY_GROUP_LEVELS):
+            return Response(json.dumps({'error': f'group_by must be a list of {", ".join(SUMMARY_GROUP_LEVELS)}'}),
+                            status=400, content_type='application/json')
+        if group_by != ['variant'] and (limit or after or output_format in STREAM_CONTENT_TYPES):
+            return Response(json.dumps({'error': 'group_by cannot be combined with pagination or streaming'}),
+                            status=400, content_type='application/json')
+
+        if output_format in STREAM_CONTENT_TYPES:
+            # Streaming mode: the whole (filtered) summary, chunked straight from a server-side cursor.
+            try:
+                chunks = self._stream_order_summary(
+                    output_format,
+                    product_template_ids=product_templates or None,
+                    delivery_ids=delivery_ids or None,
+                    **period,
+                )
+            except SummaryBusy:
+                return self._busy_response(self._get_admission_limits()['queue_timeout'])
+            except errors.QueryCanceled:
+                _logger.warning("Order summary stream cancelled by the statement timeout")
+                return Response(json.dumps({'error': 'The order summary query timed out.'}), status=503,
+                                content_type='application/json')
+            return Response(chunks, status=200, content_type=STREAM_CONTENT_TYPES[output_format],
+                            direct_passthrough=True)
+
+        # Answer unchanged polls from the summary version alone: no SQL on the
+        # summary tables and no serialization. Each representation (format,
+        # layout, compression) is cached, and tagged, on its own.
+        encoding = summary_encoding.negotiate_encoding(request.httprequest.accept_encodings)
+        summary = request.env['order.summary.line'].sudo()
+        with _phase('version'):
+            version = summary._get_summary_version()
+        cache_key = summary_cache.make_key(
+            request.env.cr.dbname, product_templates, delivery_ids, after=after, limit=limit,
+            group_by=tuple(sorted(group_by)), date_from=date_from, date_to=date_to,
+            company_ids=tuple(sorted(set(company_ids))), output_format=output_format, layout=layout,
+            encoding=encoding,
+        )
+        etag = summary_cache.make_etag(version, cache_key)
+        # Conditional requests only apply to reads: a POST always gets the body.
+        if request.httprequest.method == 'GET' and request.httprequest.if_none_match.contains(etag):
+            CACHE_LOOKUPS.inc(result='not_modified')
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.headers['Vary'] = 'Accept, Accept-Encoding'
+            return response
+
+        computed = []
+
+        def compute(cr):
+            # The request transaction took its snapshot before the version
+            # was read: read through a cursor whose snapshot is newer, so the
+            # result is never older than the version it is cached under.
+            computed.append(True)
+            reader = summary.with_env(summary.env(cr=cr))
+            with _phase('sql'), reader._read_guard():
+                # Clients resume real-time updates (or resync) from this sequence number.
+                headers = {'X-Summary-Seq': str(reader._get_update_seq())}
+                # Fetch one extra row to know whether another page follows.
+                data = self._get_order_summary_data(
+                    reader,
+                    product_template_ids=product_templates or None,
+                    delivery_ids=delivery_ids or None,
+                    after=after,
+                    limit=limit + 1 if limit else None,
+                    group_by=group_by,
+                    **period,
+                )
+            if limit and len(data) > limit:
+                data = data[:limit]
+                headers['X-Next-After'] = str(data[-1]['product_id'])
+            headers['X-Summary-Rows'] = str(len(data))
+            with _phase('serialize'):
+                body = summary_encoding.encode(data, output_format, layout)
+            with _phase('compress'):
+                body, applied_encoding = summary_encoding.compress(body, encoding)
+            if applied_encoding:
+                headers['Content-Encoding'] = applied_encoding
+            return body, headers
+
+        limits = self._get_admission_limits()
+        try:
+            with _phase('cache'):
+                cached = summary_cache.get(cache_key, version)
+            if cached:
+                CACHE_LOOKUPS.inc(result='hit')
+                body, headers = cached
+            else:
+                # Identical requests in flight share this execution and its result.
+                body, headers = summary_gate.run(
+                    request.env.registry, cache_key, version, compute,
+                    heavy=not product_templates and not (limit and limit <= HEAVY_PAGE_SIZE),
+                    **limits,
+                )
+                CACHE_LOOKUPS.inc(result='miss' if computed else 'coalesced')
+                summary_cache.max_bytes = int(request.env['ir.config_parameter'].sudo().get_param(
+                    'order_summary_api.cache_max_mb', DEFAULT_CACHE_MAX_MB)) * 1024 * 1024
+                summary_cache.put(cache_key, version, body, headers)
+            ROWS.inc(int(headers.get('X-Summary-Rows', 0)), endpoint='get_order_summary')
+
+            response = Response(body, status=200, content_type=summary_encoding.MEDIA_TYPES[output_format],
+                                headers=headers)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['Vary'] = 'Accept, Accept-Encoding'
+            return response
+        except SummaryBusy:
+            return self._busy_response(limits['queue_timeout'])
+        except errors.QueryCanceled:
+            _logger.warning("Order summary query cancelled by the statement timeout")
+            return Response(json.dumps({'error': 'The order summary query timed out.'}), status=503,
+                            content_type='application/json')
         except Exception as e:
             _logger.exception("Failed to get order summary data")
-            return Response(json.dumps({'error': str(e)}), status=500, content_type='application/json')
\ No newline at end of file
+            return Response(json.dumps({'error': str(e)}), status=500, content_type='application/json')
+
+    @http.route('/api/v1/order-summary/batch', type='http', auth='none', methods=['POST'], csrf=False)
+    @instrumented
+    @jwt_required
+    def get_order_summary_batch(self, **kwargs):
+        """
+        Protected endpoint answering many named filter sets in one round trip.
+
+        The JSON body maps names to filters, ``{"filter_sets": {name:
+        {"product_templates": [...], "delivery_ids": [...]}}}``; the response
+        maps the same names to their summary rows, in the representation
+        negotiated as on GET /api/v1/order-summary.
+        """
+        try:
+            filter_sets = json.loads(request.httprequest.data)['filter_sets']
+            if not isinstance(filter_sets, dict):
+                raise TypeError(filter_sets)
+            filter_sets = {
+                str(name): (
+                    _strict_ids(filters.get('product_templates')),
+                    _strict_ids(filters.get('delivery_ids')),
+                )
+                for name, filters in filter_sets.items()
+            }
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return Response(json.dumps({'error': 'Invalid JSON body, expected {"filter_sets": {name: '
+                                                 '{"product_templates": [...], "delivery_ids": [...]}}}'}),
+                            status=400, content_type='application/json')
+
+        max_batch_size = int(request.env['ir.config_parameter'].sudo().get_param(
+            'order_summary_api.max_batch_size', DEFAULT_MAX_BATCH_SIZE))
+        if not 0 < len(filter_sets) <= max_batch_size:
+            return Response(json.dumps({'error': f'A batch must contain between 1 and {max_batch_size} filter sets'}),
+                            status=400, content_type='application/json')
+        max_batch_rows = int(request.env['ir.config_parameter'].sudo().get_param(
+            'order_summary_api.max_batch_rows', DEFAULT_MAX_BATCH_ROWS))
+
+        output_format = kwargs.get('format') or summary_encoding.negotiate_format(
+            request.httprequest.accept_mimetypes)
+        if output_format not in summary_encoding.available_formats():
+            return Response(json.dumps({'error': f'The {output_format} format is not available for batches'}),
+                            status=406, content_type='application/json')
+        layout = kwargs.get('layout') or 'rows'
+        if layout not in summary_encoding.LAYOUTS:
+            return Response(json.dumps({'error': 'Invalid layout, expected rows or columns'}), status=400,
+                            content_type='application/json')
+
+        summary = request.env['order.summary.line'].sudo()
+        limits = self._get_admission_limits()
+        try:
+            # A set without templates returns the whole catalogue, so the
+            # number of sets alone does not bound the response.
+            with _phase('sql'), summary._read_guard():
+                batch_rows = summary._count_batch_rows(filter_sets)
+            if batch_rows > max_batch_rows:
+                return Response(json.dumps({'error': f'The batch would return {batch_rows} rows, more than the '
+                                                     f'{max_batch_rows} allowed; split it or filter by product '
+                                                     'templates'}),
+                                status=400, content_type='application/json')
+            # A batch reads as much as many unfiltered requests: always heavy.
+            with summary_gate.admit(request.env.registry, **limits):
+                with _phase('sql'), summary._read_guard():
+                    results = summary._read_batch_summary(filter_sets)
+            ROWS.inc(sum(len(rows) for rows in results.values()), endpoint='get_order_summary_batch')
+            with _phase('serialize'):
+                if layout == 'columns':
+                    results = {name: summary_encoding.to_columns(rows) for name, rows in results.items()}
+                body = summary_encoding.encode({'results': results}, output_format)
+            with _phase('compress'):
+                body, applied_encoding = summary_encoding.compress(
+                    body, summary_encoding.negotiate_encoding(request.httprequest.accept_encodings))
+            response = Response(body, status=200, content_type=summary_encoding.MEDIA_TYPES[output_format])
+            if applied_encoding:
+                response.headers['Content-Encoding'] = applied_encoding
+            response.headers['Vary'] = 'Accept, Accept-Encoding'
+            return response
+        except SummaryBusy:
+            return self._busy_response(limits['queue_timeout'])
+        except errors.QueryCanceled:
+            _logger.warning("Order summary batch query cancelled by the statement timeout")
+            return Response(json.dumps({'error': 'The order summary query timed out.'}), status=503,
+                            content_type='application/json')
+        except Exception as e:
+            _logger.exception("Failed to get order summary batch")
+            return Response(json.dumps({'error': str(e)}), status=500, content_type='application/json')
+
+    @http.route('/api/v1/order-summary/changes', type='http', auth='none', methods=['GET'], csrf=False)
+    @instrumented
+    @jwt_required
+    def get_order_summary_changes(self, **kwargs):
+        """
+        Protected endpoint returning the summary lines changed after sequence
+        number ``since``, so reconnecting clients catch up without a full reload.
+        """
+        try:
+            since = int(kwargs.get('since') or 0)
+        except (ValueError, TypeError):
+            return Response(json.dumps({'error': 'Invalid format for since'}), status=400,
+                            content_type='application/json')
+
+        try:
+            summary = request.env['order.summary.line'].sudo()
+            with _phase('sql'), summary._read_guard():
+                seq, changes = summary._read_changes_since(since)
+            ROWS.inc(len(changes), endpoint='get_order_summary_changes')
+            return Response(json.dumps({'seq': seq, 'changes': changes}, default=float), status=200,
+                            content_type='application/json')
+        except errors.QueryCanceled:
+            _logger.warning("Order summary changes query cancelled by the statement timeout")
+            return Response(json.dumps({'error': 'The order summary query timed out.'}), status=503,
+                            content_type='application/json')
+        except Exception as e:
+            _logger.exception("Failed to get order summary changes")
+            return Response(json.dumps({'error': str(e)}), status=500, content_type='application/json')
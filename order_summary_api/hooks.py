@@ -0,0 +1,7 @@
+# order_summary_api/hooks.py
+
+
+def post_init_hook(env):
+    """Populates the persisted order summary and its daily rollup from existing documents."""
+    env['order.summary.line'].rebuild()
+    env['order.summary.daily'].rebuild()
@@ -0,0 +1,14 @@
+# order_summary_api/migrations/18.0.1.1.0/post-migrate.py
+from odoo import SUPERUSER_ID, api
+
+
+def migrate(cr, version):
+    """
+    Populates the persisted order summary and its daily rollup, which
+    post_init_hook only fills on new installs, from the existing documents.
+    """
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['order.summary.line'].rebuild()
+    env['order.summary.daily'].rebuild()
@@ -1,2 +1,12 @@
 # order_summary_api/models/__init__.py
-from . import stock_move
\ No newline at end of file
+from . import ir_config_parameter
+from . import ir_http
+from . import order_summary_line
+from . import order_summary_daily
+from . import product
+from . import refresh_token
+from . import sale_order
+from . import sale_order_line
+from . import mrp_production
+from . import stock_move
+from . import benchmark
\ No newline at end of file
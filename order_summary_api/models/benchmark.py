@@ -1,38 +1,316 @@
-from odoo import models, api
-import time
+# order_summary_api/models/benchmark.py
+import json
 import logging
-from datetime import datetime
+import math
+import time
+
+import jwt
+
+from odoo import api, fields, models
+
+from odoo.addons.order_summary_api.tools import summary_cache, summary_encoding
+
+from .order_summary_line import _LIVE_SUMMARY_QUERY
 
 _logger = logging.getLogger(__name__)
 
+# Share of the seeded products that also get a done manufacturing order and a
+# done outgoing move; every product gets a sale order line.
+MANUFACTURED_RATIO = 0.2
+DELIVERED_RATIO = 0.5
+SEED_BATCH_SIZE = 1000
+# p95 slowdown (relative to the baseline run) reported as a regression.
+REGRESSION_THRESHOLD = 0.2
+
+
+def _percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(percent * len(sorted_values) / 100) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
 
 class OrderSummaryBenchmark(models.Model):
+    """
+    One benchmark run at a given dataset size.
+
+    Synthetic data is seeded inside a savepoint that is rolled back once the
+    timings are taken, so runs never leave records behind; only the run and
+    its results are kept, to compare against later runs.
+
+    Seeding writes thousands of orders and moves in one transaction, so run
+    the suite on a throwaway copy of the database rather than on the live
+    one. The HTTP phases need a test server and only run from the
+    ``order_summary_benchmark`` HttpCase (tests/test_benchmark_http.py).
+    """
     _name = 'order.summary.benchmark'
     _description = 'Order Summary Performance Benchmark'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(required=True)
+    dataset_size = fields.Integer(required=True)
+    iterations = fields.Integer(required=True)
+    seed_time_ms = fields.Float()
+    query_plan = fields.Text(help="EXPLAIN (ANALYZE, BUFFERS) of the summary read query.")
+    live_query_plan = fields.Text(help="EXPLAIN (ANALYZE, BUFFERS) of the full recompute over source tables.")
+    result_ids = fields.One2many('order.summary.benchmark.result', 'benchmark_id')
 
-    def run_benchmark(self, dataset_sizes=[1000, 10000, 50000]):
-        """Run performance benchmarks for different dataset sizes"""
-        results = {}
+    @api.model
+    def run_benchmark(self, dataset_sizes=(1000, 10000, 50000), iterations=20, name=None, http_get=None):
+        """
+        Runs the suite for each dataset size and returns the stored runs.
 
+        ``http_get``, a callable (path, headers) -> (status, body) going
+        through a test HTTP server, adds the HTTP phases; without it they
+        are skipped.
+        """
+        name = name or fields.Datetime.to_string(fields.Datetime.now())
+        runs = self.browse()
         for size in dataset_sizes:
-            _logger.info(f"Running benchmark for {size} records...")
+            _logger.info("Running order summary benchmark for %s products...", size)
+            runs |= self._run_one(size, iterations, name, http_get)
+        return runs
+
+    def _run_one(self, size, iterations, name, http_get=None):
+        self.env.flush_all()
+        savepoint = self.env.cr.savepoint(flush=False)
+        try:
+            start = time.perf_counter()
+            template_ids = self._seed_dataset(size)
+            seed_time = time.perf_counter() - start
+
+            summary = self.env['order.summary.line'].sudo()
+            rows = summary._read_summary()
+            columns_body = summary_encoding.encode(rows, layout='columns')
+            filtered_templates = template_ids[:max(len(template_ids) // 100, 1)]
+
+            results = [
+                self._measure('query', iterations, lambda: summary._read_summary()),
+                self._measure('query_filtered', iterations,
+                              lambda: summary._read_summary(product_template_ids=filtered_templates)),
+                self._measure('query_page', iterations, lambda: summary._read_summary(limit=500)),
+                self._measure('live_recompute', max(iterations // 4, 1), lambda: summary.verify()),
+                self._measure('serialization', iterations, lambda: summary_encoding.encode(rows), rows=len(rows)),
+                self._measure('serialization_columns', iterations,
+                              lambda: summary_encoding.encode(rows, layout='columns'), rows=len(rows)),
+                self._measure('serialization_msgpack', iterations,
+                              lambda: summary_encoding.encode(rows, 'msgpack', 'columns'), rows=len(rows))
+                if summary_encoding.msgpack else None,
+                self._measure('compression_gzip', iterations,
+                              lambda: summary_encoding.compress(columns_body, 'gzip')[0], rows=len(rows)),
+                self._measure('compression_br', iterations,
+                              lambda: summary_encoding.compress(columns_body, 'br')[0], rows=len(rows))
+                if summary_encoding.brotli else None,
+                self._measure_http(http_get, iterations, len(rows)) if http_get else None,
+                self._measure_http(http_get, iterations, len(rows), cached=True) if http_get else None,
+            ]
+            query, params = summary._summary_query()
+            query_plan = self._explain(query, params)
+            live_query_plan = self._explain(_LIVE_SUMMARY_QUERY, {})
+        finally:
+            self.env.flush_all()
+            savepoint.close(rollback=True)
+            self.env.invalidate_all(flush=False)
+
+        run = self.create({
+            'name': name,
+            'dataset_size': size,
+            'iterations': iterations,
+            'seed_time_ms': seed_time * 1000,
+            'query_plan': query_plan,
+            'live_query_plan': live_query_plan,
+            'result_ids': [fields.Command.create(result) for result in results if result],
+        })
+        for regression in run.compare():
+            _logger.warning(
+                "Benchmark regression at %s products, phase %s: p95 %.2f ms -> %.2f ms",
+                size, regression['phase'], regression['baseline_p95_ms'], regression['p95_ms'],
+            )
+        return run
+
+    # --- Dataset seeding ---
+
+    def _seed_dataset(self, size):
+        """
+        Creates ``size`` products with one sale order line each, plus done
+        manufacturing orders and done outgoing moves for a share of them.
+        Returns the ids of the created templates.
+
+        Their summary lines are maintained by deltas, as in production: a
+        rebuild would lock the whole summary table for the entire run.
+        """
+        env = self.env
+        summary = env['order.summary.line'].sudo()
+        partner = env['res.partner'].create({'name': 'Order Summary Benchmark Customer'})
+        picking_type = env['stock.picking.type'].search(
+            [('code', '=', 'outgoing'), ('company_id', '=', env.company.id)], limit=1,
+        )
+
+        template_ids = []
+        for offset in range(0, size, SEED_BATCH_SIZE):
+            count = min(SEED_BATCH_SIZE, size - offset)
+            templates = env['product.template'].create([{
+                'name': f"Benchmark Product {offset + i:07d}",
+                'default_code': f"BENCH-{offset + i:07d}",
+            } for i in range(count)])
+            products = templates.product_variant_ids
+            template_ids += templates.ids
+
+            env['sale.order'].create({
+                'partner_id': partner.id,
+                'order_line': [
+                    fields.Command.create({'product_id': product.id, 'product_uom_qty': 10})
+                    for product in products
+                ],
+            })
+
+            manufactured = products[:int(count * MANUFACTURED_RATIO)]
+            if manufactured:
+                productions = env['mrp.production'].create([{
+                    'product_id': product.id,
+                    'product_uom_id': product.uom_id.id,
+                    'product_qty': 5,
+                } for product in manufactured])
+                productions.flush_recordset()
+                env.cr.execute("UPDATE mrp_production SET state = 'done' WHERE id IN %s", [tuple(productions.ids)])
+                summary._apply_deltas('manufactured_qty', {product.id: 5 for product in manufactured})
+
+            delivered = products[:int(count * DELIVERED_RATIO)]
+            if delivered and picking_type:
+                picking = env['stock.picking'].create({
+                    'partner_id': partner.id,
+                    'picking_type_id': picking_type.id,
+                    'location_id': picking_type.default_location_src_id.id,
+                    'location_dest_id': env.ref('stock.stock_location_customers').id,
+                    'move_ids': [fields.Command.create({
+                        'name': product.display_name,
+                        'product_id': product.id,
+                        'product_uom': product.uom_id.id,
+                        'product_uom_qty': 3,
+                        'location_id': picking_type.default_location_src_id.id,
+                        'location_dest_id': env.ref('stock.stock_location_customers').id,
+                    }) for product in delivered],
+                })
+                env.flush_all()
+                # Mark the moves done directly: the benchmark measures reads,
+                # not the reservation and validation workflow.
+                env.cr.execute("""
+                    UPDATE stock_move SET state = 'done', quantity = product_uom_qty, picked = true
+                    WHERE picking_id = %s
+                """, [picking.id])
+                summary._apply_deltas('delivered_qty', {product.id: 3 for product in delivered})
+
+        env.invalidate_all()
+        return template_ids
+
+    # --- Measurements ---
+
+    def _measure(self, phase, iterations, func, rows=None):
+        """
+        Times ``func`` with perf_counter after one warm-up call. The size of
+        its result is recorded when it returns a payload (bytes).
+        """
+        result = func()
+        if rows is None:
+            rows = len(result) if isinstance(result, list) else 0
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return self._make_result(phase, timings, rows, len(result) if isinstance(result, bytes) else 0)
+
+    def _measure_http(self, http_get, iterations, rows, cached=False):
+        """
+        Times the full GET /api/v1/order-summary round trip through
+        ``http_get``. Unless ``cached`` is set, the response cache is emptied
+        before each call so the SQL and serialization are part of the timing.
+        The test server shares this process' response cache.
+        """
+        keys, kid = self.env['ir.config_parameter'].sudo()._get_order_summary_jwt_keys()
+        if not kid:
+            _logger.warning("Skipping HTTP benchmark: no active JWT signing key is configured")
+            return None
+        token = jwt.encode({'uid': self.env.uid, 'exp': time.time() + 3600, 'iat': time.time(),
+                            'db': self.env.cr.dbname}, keys[kid], algorithm="HS256", headers={'kid': kid})
+        headers = {'Authorization': f'Bearer {token}'}
+        self.env.flush_all()
+
+        def call():
+            if not cached:
+                summary_cache.clear()
+            status, body = http_get('/api/v1/order-summary', headers)
+            if status != 200:
+                raise RuntimeError(f"order-summary returned HTTP {status}")
+            return body
+        return self._measure('http_cached' if cached else 'http', iterations, call, rows=rows)
+
+    @api.model
+    def _make_result(self, phase, timings, rows, payload_bytes=0):
+        timings = sorted(timings)
+        p50 = _percentile(timings, 50)
+        return {
+            'phase': phase,
+            'iterations': len(timings),
+            'rows': rows,
+            'payload_bytes': payload_bytes,
+            'mean_ms': sum(timings) / len(timings) * 1000 if timings else 0.0,
+            'p50_ms': p50 * 1000,
+            'p95_ms': _percentile(timings, 95) * 1000,
+            'p99_ms': _percentile(timings, 99) * 1000,
+            'rows_per_sec': rows / p50 if p50 else 0.0,
+        }
+
+    def _explain(self, query, params):
+        self.env.cr.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+        return json.dumps(self.env.cr.fetchone()[0], indent=2)
 
-            query_time = self._benchmark_query()
+    # --- Comparison ---
 
-            results[size] = {
-                'query_time_ms': query_time * 1000,
-                'timestamp': datetime.now().isoformat()
-            }
+    def _get_baseline(self):
+        """The previous run at the same dataset size, if any."""
+        self.ensure_one()
+        return self.search([
+            ('dataset_size', '=', self.dataset_size),
+            ('id', '<', self.id),
+        ], order='id desc', limit=1)
 
-        return results
+    def compare(self, baseline=None, threshold=REGRESSION_THRESHOLD):
+        """
+        Returns the phases whose p95 is more than ``threshold`` slower than in
+        ``baseline`` (by default the previous run at the same size).
+        """
+        self.ensure_one()
+        baseline = baseline or self._get_baseline()
+        if not baseline:
+            return []
+        baseline_results = {result.phase: result for result in baseline.result_ids}
+        regressions = []
+        for result in self.result_ids:
+            previous = baseline_results.get(result.phase)
+            if previous and previous.p95_ms and result.p95_ms > previous.p95_ms * (1 + threshold):
+                regressions.append({
+                    'phase': result.phase,
+                    'p95_ms': result.p95_ms,
+                    'baseline_p95_ms': previous.p95_ms,
+                    'baseline_id': baseline.id,
+                })
+        return regressions
 
-    def _benchmark_query(self):
-        """Benchmark the optimized query"""
-        order_summary = self.env['order.summary']
 
-        start_time = time.time()
-        for _ in range(5):
-            order_summary.get_order_summary_data()
-        end_time = time.time()
+class OrderSummaryBenchmarkResult(models.Model):
+    _name = 'order.summary.benchmark.result'
+    _description = 'Order Summary Benchmark Result'
+    _order = 'benchmark_id, id'
 
-        return (end_time - start_time) / 5
\ No newline at end of file
+    benchmark_id = fields.Many2one('order.summary.benchmark', required=True, ondelete='cascade', index=True)
+    phase = fields.Char(required=True)
+    iterations = fields.Integer()
+    rows = fields.Integer()
+    payload_bytes = fields.Integer(string="Payload (bytes)", help="Size of the produced body, for encoding and HTTP phases.")
+    mean_ms = fields.Float(string="Mean (ms)")
+    p50_ms = fields.Float(string="p50 (ms)")
+    p95_ms = fields.Float(string="p95 (ms)")
+    p99_ms = fields.Float(string="p99 (ms)")
+    rows_per_sec = fields.Float(string="Rows/s")
@@ -0,0 +1,45 @@
+# order_summary_api/models/ir_config_parameter.py
+import json
+import logging
+
+from odoo import models
+from odoo.tools import frozendict, ormcache
+
+from odoo.addons.order_summary_api.tools import LEGACY_JWT_KID
+
+_logger = logging.getLogger(__name__)
+
+
+class IrConfigParameter(models.Model):
+    _inherit = 'ir.config_parameter'
+
+    @ormcache()
+    def _get_order_summary_jwt_keys(self):
+        """
+        Returns (keys, active_kid): the JWT signing keys by key id and the id
+        of the one used to sign new tokens.
+
+        Keys come from order_summary_api.jwt_keys, a JSON object {kid: secret},
+        plus the legacy order_summary_api.jwt_secret as kid 'default'. The
+        active key is order_summary_api.jwt_active_kid, falling back to
+        'default'. Several keys can be active for verification at once so a
+        key can be rotated in before the old one is retired.
+
+        The result is cached in the registry cache, which Odoo clears in every
+        worker whenever a system parameter changes.
+        """
+        get_param = self.sudo().get_param
+        keys = {}
+        legacy_secret = get_param('order_summary_api.jwt_secret')
+        if legacy_secret:
+            keys[LEGACY_JWT_KID] = legacy_secret
+        raw_keys = get_param('order_summary_api.jwt_keys')
+        if raw_keys:
+            try:
+                keys.update({str(kid): secret for kid, secret in json.loads(raw_keys).items() if secret})
+            except (ValueError, AttributeError):
+                _logger.error("order_summary_api.jwt_keys is not a valid JSON object, ignoring it.")
+        active_kid = get_param('order_summary_api.jwt_active_kid') or LEGACY_JWT_KID
+        if active_kid not in keys:
+            active_kid = None
+        return frozendict(keys), active_kid
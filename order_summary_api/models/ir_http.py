@@ -0,0 +1,17 @@
+# order_summary_api/models/ir_http.py
+import odoo
+from odoo import models
+
+from odoo.addons.order_summary_api.tools import OrderSummaryDispatcher
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = 'ir.http'
+
+    @classmethod
+    def _pre_dispatch(cls, rule, args):
+        super()._pre_dispatch(rule, args)
+        # Processes serving requests take part in the real-time dispatcher
+        # election; the gevent process only serves the bus.
+        if not odoo.evented:
+            OrderSummaryDispatcher.ensure_started()
@@ -0,0 +1,32 @@
+# order_summary_api/models/mrp_production.py
+from collections import defaultdict
+
+from odoo import models
+
+
+class MrpProduction(models.Model):
+    _inherit = 'mrp.production'
+
+    def button_mark_done(self):
+        # The action may stop on a wizard (backorder, consumption warning) without
+        # finishing anything, so compare done quantities before and after.
+        before = self._order_summary_done_quantities()
+        res = super().button_mark_done()
+        after = self._order_summary_done_quantities()
+
+        deltas = defaultdict(float)
+        for product_id, qty in after.items():
+            deltas[product_id] += qty
+        for product_id, qty in before.items():
+            deltas[product_id] -= qty
+        self.env['order.summary.line'].sudo()._apply_deltas('manufactured_qty', deltas)
+        if deltas:
+            self.env['order.summary.daily'].sudo()._mark_dirty(self.exists().mapped('date_finished'))
+        return res
+
+    def _order_summary_done_quantities(self):
+        quantities = defaultdict(float)
+        for production in self.exists():
+            if production.state == 'done':
+                quantities[production.product_id.id] += production.product_qty
+        return quantities
@@ -0,0 +1,296 @@
+# order_summary_api/models/order_summary_daily.py
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# First day not rolled up yet; every earlier day is in order_summary_daily.
+ROLLUP_DATE_PARAM = 'order_summary_api.daily_rollup_date'
+# Days a day stays open after it ends, so that the transactions still
+# writing to it have committed, and marked it, before it is rolled up.
+ROLLUP_LAG_DAYS = 1
+
+# Per (day, variant, company) quantities recomputed from the source tables.
+# Each {*_period} placeholder restricts one source on its own date column,
+# so only the days being rolled up (or read live) are scanned. Days are UTC
+# days, as stored by the ORM.
+_DAILY_SOURCE_QUERY = """
+    SELECT
+        date,
+        product_id,
+        company_id,
+        SUM(ordered_qty) AS ordered_qty,
+        SUM(manufactured_qty) AS manufactured_qty,
+        SUM(delivered_qty) AS delivered_qty
+    FROM (
+        SELECT
+            so.date_order::date AS date,
+            sol.product_id,
+            sol.company_id,
+            sol.product_uom_qty AS ordered_qty,
+            0 AS manufactured_qty,
+            0 AS delivered_qty
+        FROM
+            sale_order_line sol
+        JOIN
+            sale_order so ON (so.id = sol.order_id)
+        WHERE sol.product_id IS NOT NULL
+          AND ({sale_period})
+        UNION ALL
+        SELECT
+            mp.date_finished::date,
+            mp.product_id,
+            mp.company_id,
+            0,
+            mp.product_qty,
+            0
+        FROM
+            mrp_production mp
+        WHERE mp.state = 'done'
+          AND ({production_period})
+        UNION ALL
+        SELECT
+            sm.date::date,
+            sm.product_id,
+            sm.company_id,
+            0,
+            0,
+            sm.quantity
+        FROM
+            stock_move sm
+        JOIN
+            stock_picking sp ON (sm.picking_id = sp.id)
+        JOIN
+            stock_picking_type spt ON (spt.id = sp.picking_type_id AND spt.code = 'outgoing')
+        WHERE sm.state = 'done'
+          AND ({move_period})
+    ) source
+    GROUP BY date, product_id, company_id
+"""
+
+
+class OrderSummaryDaily(models.Model):
+    """
+    Daily per-variant and per-company pre-aggregate of the order summary.
+
+    Closed days are rolled up once by a daily cron, so a date-range summary
+    reads one row per active variant and day instead of rescanning the
+    source tables. Days that are not rolled up yet (today, yesterday, and
+    any day since the last run) are read live. So are closed days whose
+    source documents changed after their rollup: they are recorded in
+    order_summary_daily_dirty and rolled up again by the next run.
+    """
+    _name = 'order.summary.daily'
+    _description = 'Order Summary Daily Aggregate'
+    _log_access = False
+
+    date = fields.Date(required=True)
+    product_id = fields.Many2one('product.product', required=True, index=True, ondelete='cascade')
+    company_id = fields.Many2one('res.company', ondelete='cascade')
+    ordered_qty = fields.Float(digits='Product Unit of Measure', default=0.0)
+    manufactured_qty = fields.Float(digits='Product Unit of Measure', default=0.0)
+    delivered_qty = fields.Float(digits='Product Unit of Measure', default=0.0)
+
+    _sql_constraints = [
+        # Also the index of range reads, hence the leading date.
+        ('date_product_company_uniq', 'unique(date, product_id, company_id)',
+         'Only one daily summary per day, product variant and company is allowed.'),
+    ]
+
+    def init(self):
+        # Closed days changed after they were rolled up.
+        self.env.cr.execute("CREATE TABLE IF NOT EXISTS order_summary_daily_dirty (date date PRIMARY KEY)")
+
+    # --- Rollup state ---
+
+    @api.model
+    def _get_rollup_date(self):
+        """First day that is not rolled up yet, or None before the first run."""
+        value = self.env['ir.config_parameter'].sudo().get_param(ROLLUP_DATE_PARAM)
+        return fields.Date.to_date(value) if value else None
+
+    @api.model
+    def _get_dirty_dates(self):
+        self.env.cr.execute("SELECT date FROM order_summary_daily_dirty ORDER BY date")
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _mark_dirty(self, dates):
+        """
+        Records the past days among ``dates`` (dates or datetimes) as
+        changed, so that reads take them live until the next rollup. Runs in
+        the caller's transaction.
+
+        Every past day is marked, not only the rolled up ones: a rollup
+        committing meanwhile may close a day this transaction still sees
+        open. Today is never closed by then (see ROLLUP_LAG_DAYS), which
+        keeps the marks off the hot path of same-day documents.
+        """
+        today = fields.Date.today()
+        days = {fields.Date.to_date(value) for value in dates if value}
+        days = sorted(day for day in days if day < today)
+        if days:
+            self.env.cr.execute("""
+                INSERT INTO order_summary_daily_dirty (date)
+                SELECT unnest(%s::date[])
+                ON CONFLICT DO NOTHING
+            """, [days])
+
+    # --- Queries ---
+
+    @api.model
+    def _period_condition(self, column, periods, params):
+        """
+        Returns the SQL condition keeping ``column`` within any of
+        ``periods``, a list of (start, stop) dates where stop is exclusive
+        and either bound may be None. The bounds are added to ``params``.
+        """
+        clauses = []
+        for index, (start, stop) in enumerate(periods):
+            bounds = []
+            if start:
+                params[f'period_start_{index}'] = start
+                bounds.append(f"{column} >= %(period_start_{index})s")
+            if stop:
+                params[f'period_stop_{index}'] = stop
+                bounds.append(f"{column} < %(period_stop_{index})s")
+            clauses.append("(" + (" AND ".join(bounds) or "TRUE") + ")")
+        return " OR ".join(clauses) or "FALSE"
+
+    @api.model
+    def _source_query(self, periods, params):
+        """The live per-day aggregate of the source documents dated within ``periods``."""
+        return _DAILY_SOURCE_QUERY.format(
+            sale_period=self._period_condition("so.date_order", periods, params),
+            production_period=self._period_condition("mp.date_finished", periods, params),
+            move_period=self._period_condition("sm.date", periods, params),
+        )
+
+    @api.model
+    def _range_query(self, date_from=None, date_to=None, company_ids=None):
+        """
+        Builds a query of per-variant totals (product_id and the quantity
+        columns of order.summary.line) over the days from ``date_from`` to
+        ``date_to`` included, either bound being optional, restricted to
+        ``company_ids`` when given.
+
+        Rolled up days are read from this table; the others are aggregated
+        live from the source documents of those days only, so the cost
+        follows the number of days in the range rather than the history.
+        """
+        params = {}
+        stop = date_to + timedelta(days=1) if date_to else None
+        rollup_date = self._get_rollup_date()
+        rollup_conditions = ["FALSE"]
+        live_periods = [(date_from, stop)]
+        if rollup_date:
+            dirty_dates = [
+                day for day in self._get_dirty_dates()
+                if day < rollup_date and (not date_from or day >= date_from) and (not date_to or day <= date_to)
+            ]
+            rollup_conditions = ["d.date < %(period_rollup_date)s"]
+            params['period_rollup_date'] = rollup_date
+            if date_from:
+                rollup_conditions.append("d.date >= %(period_date_from)s")
+                params['period_date_from'] = date_from
+            if date_to:
+                rollup_conditions.append("d.date <= %(period_date_to)s")
+                params['period_date_to'] = date_to
+            if dirty_dates:
+                rollup_conditions.append("d.date <> ALL(%(period_dirty_dates)s::date[])")
+                params['period_dirty_dates'] = list(dirty_dates)
+
+            live_start = max(rollup_date, date_from) if date_from else rollup_date
+            live_periods = [(day, day + timedelta(days=1)) for day in dirty_dates]
+            if not stop or live_start < stop:
+                live_periods.append((live_start, stop))
+
+        live_conditions = ["TRUE"]
+        if company_ids:
+            rollup_conditions.append("d.company_id = ANY(%(period_company_ids)s::int[])")
+            live_conditions = ["live.company_id = ANY(%(period_company_ids)s::int[])"]
+            params['period_company_ids'] = list(company_ids)
+
+        query = """
+            SELECT
+                period.product_id,
+                SUM(period.ordered_qty) AS ordered_qty,
+                SUM(period.manufactured_qty) AS manufactured_qty,
+                SUM(period.delivered_qty) AS delivered_qty
+            FROM (
+                SELECT d.product_id, d.ordered_qty, d.manufactured_qty, d.delivered_qty
+                FROM order_summary_daily d
+                WHERE {rollup_where}
+                UNION ALL
+                SELECT live.product_id, live.ordered_qty, live.manufactured_qty, live.delivered_qty
+                FROM ({live_query}) live
+                WHERE {live_where}
+            ) period
+            GROUP BY period.product_id
+        """.format(
+            rollup_where=" AND ".join(rollup_conditions),
+            live_query=self._source_query(live_periods, params),
+            live_where=" AND ".join(live_conditions),
+        )
+        return query, params
+
+    # --- Rollup ---
+
+    @api.model
+    def _rollup(self, full=False):
+        """
+        Rolls up every closed day since the last run, plus the closed days
+        marked as changed since then, in the current transaction. With
+        ``full``, or on the first run, the whole history of closed days is
+        rolled up.
+
+        The lock must be the first statement of the transaction: it waits
+        for the transactions marking days, and the snapshot taken after it
+        sees their changes, so the marks claimed here are never cleared
+        before their changes are rolled up.
+        """
+        cr = self.env.cr
+        cr.execute("LOCK TABLE order_summary_daily_dirty IN EXCLUSIVE MODE")
+        self.env.flush_all()
+        close_date = fields.Date.today() - timedelta(days=ROLLUP_LAG_DAYS)
+        rollup_date = None if full else self._get_rollup_date()
+        cr.execute("DELETE FROM order_summary_daily_dirty WHERE date < %s RETURNING date", [close_date])
+        dirty_dates = sorted(
+            day for day, in cr.fetchall()
+            if rollup_date and day < rollup_date
+        )
+        periods = [(day, day + timedelta(days=1)) for day in dirty_dates]
+        if not rollup_date or rollup_date < close_date:
+            periods.append((rollup_date, close_date))
+        if not periods:
+            return 0
+
+        params = {}
+        cr.execute("DELETE FROM order_summary_daily WHERE {}".format(
+            self._period_condition("date", periods, params)), params)
+        params = {}
+        cr.execute("""
+            INSERT INTO order_summary_daily (date, product_id, company_id, ordered_qty, manufactured_qty, delivered_qty)
+            SELECT date, product_id, company_id, ordered_qty, manufactured_qty, delivered_qty
+            FROM ({query}) source
+        """.format(query=self._source_query(periods, params)), params)
+        count = cr.rowcount
+        if not rollup_date or rollup_date < close_date:
+            self.env['ir.config_parameter'].sudo().set_param(ROLLUP_DATE_PARAM, fields.Date.to_string(close_date))
+        self.invalidate_model()
+        _logger.info("Order summary daily rollup: %s rows over %s period(s)", count, len(periods))
+        return count
+
+    @api.model
+    def rebuild(self):
+        """Recomputes every closed day from the source documents, in the current transaction."""
+        return self._rollup(full=True)
+
+    @api.model
+    def _cron_rollup(self):
+        # The cron's own transaction has already taken its snapshot: roll up
+        # in a new one that starts with the lock.
+        with self.env.registry.cursor() as cr:
+            self.with_env(self.env(cr=cr))._rollup()
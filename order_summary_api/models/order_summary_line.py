@@ -0,0 +1,963 @@
+# order_summary_api/models/order_summary_line.py
+import hashlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from odoo import api, fields, models, sql_db
+
+from odoo.addons.order_summary_api.tools import NOTIFY_CHANNEL, OrderSummaryWebSocket, prepared_statements
+from odoo.addons.order_summary_api.tools.summary_metrics import BROADCAST_DURATION, BROADCASTS, SLOW_QUERIES
+
+_logger = logging.getLogger(__name__)
+# Summary reads slower than order_summary_api.slow_query_ms, with their plan.
+_slow_query_logger = logging.getLogger(__name__ + '.slow_query')
+
+# Aggregation levels accepted by _read_grouped_summary, most detailed first.
+SUMMARY_GROUP_LEVELS = ('variant', 'template', 'category', 'total')
+# Name of each quantity column in API rows and update messages.
+SUMMARY_API_FIELDS = {
+    'ordered_qty': 'ordered_quantity',
+    'manufactured_qty': 'manufactured_quantity',
+    'delivered_qty': 'delivered_quantity',
+}
+# Advisory lock serializing the transactions that stamp update sequence numbers.
+UPDATE_SEQ_LOCK = 0x4F535351  # 'OSSQ'
+# Largest NOTIFY payload sent, in bytes, below Postgres' 8000 byte limit.
+NOTIFY_MAX_PAYLOAD = 7500
+# Default coalescing window of real-time broadcasts, overridable through the
+# order_summary_api.broadcast_window_ms system parameter.
+DEFAULT_BROADCAST_WINDOW_MS = 500
+# Default of the order_summary_api.statement_timeout_ms system parameter,
+# bounding every summary read.
+DEFAULT_STATEMENT_TIMEOUT_MS = 30000
+# Default of the order_summary_api.slow_query_ms system parameter; 0
+# disables the slow query log.
+DEFAULT_SLOW_QUERY_MS = 1000
+
+# Quantity columns maintained incrementally on order_summary_line.
+SUMMARY_QTY_FIELDS = ('ordered_qty', 'manufactured_qty', 'delivered_qty')
+
+# Full recompute from the source tables. Only rebuild() and verify() run this;
+# the API reads the persisted table instead.
+_LIVE_SUMMARY_QUERY = """
+    WITH ordered_qty AS (
+        SELECT
+            sol.product_id,
+            SUM(sol.product_uom_qty) AS quantity
+        FROM
+            sale_order_line sol
+        WHERE sol.product_id IS NOT NULL
+        GROUP BY sol.product_id
+    ),
+    manufactured_qty AS (
+        SELECT
+            mp.product_id,
+            SUM(mp.product_qty) AS quantity
+        FROM
+            mrp_production mp
+        WHERE mp.state = 'done'
+        GROUP BY mp.product_id
+    ),
+    delivered_qty AS (
+        SELECT
+            sm.product_id,
+            SUM(sm.quantity) AS quantity
+        FROM
+            stock_move sm
+        JOIN
+            stock_picking sp ON (sm.picking_id = sp.id)
+        JOIN
+            stock_picking_type spt ON (spt.id = sp.picking_type_id AND spt.code = 'outgoing')
+        WHERE sm.state = 'done'
+        GROUP BY sm.product_id
+    )
+    SELECT
+        pp.id AS product_id,
+        pp.product_tmpl_id,
+        COALESCE(oq.quantity, 0) AS ordered_qty,
+        COALESCE(mq.quantity, 0) AS manufactured_qty,
+        COALESCE(dq.quantity, 0) AS delivered_qty
+    FROM
+        product_product pp
+    LEFT JOIN ordered_qty oq ON (pp.id = oq.product_id)
+    LEFT JOIN manufactured_qty mq ON (pp.id = mq.product_id)
+    LEFT JOIN delivered_qty dq ON (pp.id = dq.product_id)
+    WHERE oq.product_id IS NOT NULL
+       OR mq.product_id IS NOT NULL
+       OR dq.product_id IS NOT NULL
+"""
+
+def _notify_payloads(dbname, changes, deliveries, window):
+    """
+    Splits ``changes`` ({product_id: columns}) and ``deliveries``
+    ({product_id: picking ids}) into JSON NOTIFY payloads of at most
+    NOTIFY_MAX_PAYLOAD bytes. Payloads are ASCII (json.dumps escapes the
+    rest), so their length in characters is their size in bytes.
+
+    The pickings of one product may be spread over several payloads; each
+    of them then repeats the product's changed columns.
+    """
+    def dump(chunk, chunk_deliveries):
+        return json.dumps({'db': dbname, 'changes': chunk, 'deliveries': chunk_deliveries, 'window': window})
+
+    empty_size = len(dump({}, {}))
+    size, chunk, chunk_deliveries = empty_size, {}, {}
+    for product_id, columns in sorted(changes.items()):
+        key = str(product_id)
+        # Entries as serialized on their own: their braces pay for the separator.
+        columns_entry = {key: sorted(columns)}
+        columns_size = len(json.dumps(columns_entry))
+        if chunk and size + columns_size > NOTIFY_MAX_PAYLOAD:
+            yield dump(chunk, chunk_deliveries)
+            size, chunk, chunk_deliveries = empty_size, {}, {}
+        chunk.update(columns_entry)
+        size += columns_size
+        for delivery_id in sorted(deliveries.get(product_id, ())):
+            delivery_size = len(str(delivery_id)) + 2
+            if key not in chunk_deliveries:
+                delivery_size += len(json.dumps({key: []}))
+            if size + delivery_size > NOTIFY_MAX_PAYLOAD:
+                yield dump(chunk, chunk_deliveries)
+                chunk, chunk_deliveries = dict(columns_entry), {}
+                size = empty_size + columns_size
+                delivery_size = len(str(delivery_id)) + 2 + len(json.dumps({key: []}))
+            chunk_deliveries.setdefault(key, []).append(delivery_id)
+            size += delivery_size
+    if chunk:
+        yield dump(chunk, chunk_deliveries)
+
+
+# Partial / covering indexes for the hot predicates of the summary queries,
+# as (name, table, definition). The definition hash is stored as the index
+# comment so that a changed definition is dropped and recreated on upgrade.
+# They are built CONCURRENTLY once the install or upgrade has committed, see
+# _ensure_indexes.
+SUMMARY_INDEXES = [
+    ('order_summary_api_sm_done_product_idx', 'stock_move',
+     "(product_id) INCLUDE (picking_id, quantity) WHERE state = 'done'"),
+    ('order_summary_api_sm_done_picking_idx', 'stock_move',
+     "(picking_id, product_id) INCLUDE (quantity) WHERE state = 'done'"),
+    ('order_summary_api_mp_done_product_idx', 'mrp_production',
+     "(product_id) INCLUDE (product_qty) WHERE state = 'done'"),
+    ('order_summary_api_sol_product_idx', 'sale_order_line',
+     "(product_id) INCLUDE (product_uom_qty) WHERE product_id IS NOT NULL"),
+]
+
+
+class OrderSummaryLine(models.Model):
+    """
+    Persisted per-variant order summary.
+
+    Rows are kept up to date by deltas pushed from sale order lines,
+    manufacturing orders and outgoing stock moves, so reading the summary
+    costs a scan of this table instead of an aggregate over full history.
+    Only variants with some activity have a row; the read path joins
+    product_product so untouched variants still show up with zeros.
+    """
+    _name = 'order.summary.line'
+    _description = 'Order Summary Line'
+    _log_access = False
+
+    product_id = fields.Many2one('product.product', required=True, index=True, ondelete='cascade')
+    product_tmpl_id = fields.Many2one('product.template', required=True, index=True, ondelete='cascade')
+    ordered_qty = fields.Float(digits='Product Unit of Measure', default=0.0)
+    manufactured_qty = fields.Float(digits='Product Unit of Measure', default=0.0)
+    delivered_qty = fields.Float(digits='Product Unit of Measure', default=0.0)
+    seq = fields.Integer(
+        index=True, readonly=True,
+        help="Sequence number of the last real-time update that carried this line.",
+    )
+
+    _sql_constraints = [
+        ('product_uniq', 'unique(product_id)', 'Only one summary line per product variant is allowed.'),
+    ]
+
+    def init(self):
+        # Global summary version, bumped after every commit that changes the
+        # numbers. Sequences are not transactional, which is what we want here.
+        self.env.cr.execute("CREATE SEQUENCE IF NOT EXISTS order_summary_version_seq")
+        # Sequence numbers of real-time updates, drawn under UPDATE_SEQ_LOCK
+        # so that they increase in commit order.
+        self.env.cr.execute("CREATE SEQUENCE IF NOT EXISTS order_summary_update_seq")
+        # Results of in-flight summary requests, shared with the identical
+        # requests of other workers (see tools.summary_gate). Short-lived,
+        # hence not WAL-logged.
+        self.env.cr.execute("""
+            CREATE UNLOGGED TABLE IF NOT EXISTS order_summary_shared_result (
+                key varchar PRIMARY KEY,
+                version bigint NOT NULL,
+                body bytea NOT NULL,
+                headers jsonb NOT NULL,
+                create_date timestamptz NOT NULL DEFAULT now()
+            )
+        """)
+        # Metrics of all worker processes (see tools.summary_metrics), only
+        # worth keeping until the next scrape.
+        self.env.cr.execute("""
+            CREATE UNLOGGED TABLE IF NOT EXISTS order_summary_metric (
+                name varchar NOT NULL,
+                sample varchar NOT NULL,
+                labels varchar NOT NULL,
+                le varchar NOT NULL,
+                value double precision NOT NULL,
+                update_date timestamptz NOT NULL DEFAULT now(),
+                PRIMARY KEY (sample, labels, le)
+            )
+        """)
+        # Building the indexes takes a while on large tables, and must not
+        # block writes to them: it runs concurrently, after the commit.
+        self.env.cr.postcommit.add(self._ensure_indexes)
+
+    # --- Managed indexes ---
+
+    @api.model
+    def _ensure_indexes(self):
+        """
+        Creates the indexes of SUMMARY_INDEXES with CREATE INDEX
+        CONCURRENTLY, recreating those whose definition changed or whose
+        previous build failed (left INVALID). Writes to the tables go on
+        meanwhile.
+
+        Concurrent builds cannot run inside a transaction, so this uses an
+        autocommit connection of its own. init() schedules it after the
+        install or upgrade commits. It can also be run by hand, e.g. from
+        ``odoo-bin shell``::
+
+            env['order.summary.line']._ensure_indexes()
+
+        A failing index is logged and skipped.
+        """
+        with self.env.registry.cursor() as cr:
+            cr._cnx.autocommit = True
+            try:
+                for name, table, definition in SUMMARY_INDEXES:
+                    signature = 'order_summary_api:' + hashlib.sha1(definition.encode()).hexdigest()[:12]
+                    cr.execute("""
+                        SELECT obj_description(i.indexrelid, 'pg_class'), i.indisvalid
+                        FROM pg_index i
+                        WHERE i.indexrelid = to_regclass(%s)
+                    """, [name])
+                    current = cr.fetchone()
+                    if current == (signature, True):
+                        continue
+                    try:
+                        cr.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+                        cr.execute(f'CREATE INDEX CONCURRENTLY "{name}" ON "{table}" {definition}')
+                        cr.execute(f'COMMENT ON INDEX "{name}" IS %s', [signature])
+                        _logger.info("Created index %s on %s", name, table)
+                    except Exception as e:
+                        _logger.warning("Could not create index %s on %s: %s", name, table, e)
+            finally:
+                cr._cnx.autocommit = False
+
+    @api.model
+    def check_index_usage(self):
+        """
+        Explains every filter combination the summary queries can generate
+        and reports, for each, the indexes the planner picked and the tables
+        it still scans sequentially.
+        """
+        cr = self.env.cr
+        cr.execute("SELECT id FROM product_template ORDER BY id LIMIT 10")
+        template_ids = [row[0] for row in cr.fetchall()] or [0]
+        cr.execute("SELECT id FROM stock_picking ORDER BY id DESC LIMIT 10")
+        delivery_ids = [row[0] for row in cr.fetchall()] or [0]
+
+        cases = [
+            ('read', self._summary_query()),
+            ('read_templates', self._summary_query(product_template_ids=template_ids)),
+            ('read_deliveries', self._summary_query(delivery_ids=delivery_ids)),
+            ('read_templates_deliveries', self._summary_query(
+                product_template_ids=template_ids, delivery_ids=delivery_ids)),
+            ('read_last_30_days', self._summary_query(date_from=fields.Date.today() - timedelta(days=30))),
+            ('live_recompute', (_LIVE_SUMMARY_QUERY, {})),
+        ]
+        managed = {name for name, _table, _definition in SUMMARY_INDEXES}
+        report = []
+        for case, (query, params) in cases:
+            cr.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            plan = cr.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            indexes, seq_scans = set(), set()
+            nodes = [plan[0]['Plan']]
+            while nodes:
+                node = nodes.pop()
+                if 'Index Name' in node:
+                    indexes.add(node['Index Name'])
+                if node.get('Node Type') == 'Seq Scan':
+                    seq_scans.add(node.get('Relation Name'))
+                nodes.extend(node.get('Plans', []))
+            report.append({
+                'case': case,
+                'managed_indexes_used': sorted(indexes & managed),
+                'other_indexes_used': sorted(indexes - managed),
+                'seq_scans': sorted(seq_scans),
+            })
+            _logger.info("Index usage for %s: %s", case, report[-1])
+        return report
+
+    # --- Summary version ---
+
+    @api.model
+    def _get_summary_version(self):
+        self.env.cr.execute("SELECT last_value FROM order_summary_version_seq")
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _bump_summary_version(self):
+        """
+        Schedules a version bump once the current transaction commits.
+
+        Bumping after commit guarantees that a snapshot taken after reading
+        the new version also sees the new data. Cached reads therefore read
+        the version first and the data in a newer transaction (see
+        tools.summary_gate); a reader racing the commit at worst caches a
+        fresh result under the old version, which the bump then discards.
+        """
+        cr = self.env.cr
+        if cr.postcommit.data.get('order_summary_api.version_bump'):
+            return
+        cr.postcommit.data['order_summary_api.version_bump'] = True
+        registry = self.env.registry
+
+        @cr.postcommit.add
+        def bump_version():
+            with registry.cursor() as bump_cr:
+                bump_cr.execute("SELECT nextval('order_summary_version_seq')")
+
+    # --- Real-time broadcast ---
+
+    @api.model
+    def _notify_summary_change(self, column, product_ids, delivery_ids=None):
+        """
+        Collects the quantity columns changed by the current transaction per
+        product, and the deliveries ({product_id: picking ids}) that changed
+        them, and once it commits announces them to the dispatcher process
+        with NOTIFY; nothing is sent on rollback.
+        """
+        cr = self.env.cr
+        pending = cr.postcommit.data.get('order_summary_api.changed_products')
+        if pending is None:
+            pending = cr.postcommit.data['order_summary_api.changed_products'] = {}
+            pending_deliveries = cr.postcommit.data['order_summary_api.changed_deliveries'] = {}
+            window = int(self.env['ir.config_parameter'].sudo().get_param(
+                'order_summary_api.broadcast_window_ms', DEFAULT_BROADCAST_WINDOW_MS,
+            )) / 1000.0
+            dbname = cr.dbname
+
+            @cr.postcommit.add
+            def notify_dispatcher():
+                with sql_db.db_connect('postgres').cursor() as notify_cr:
+                    for payload in _notify_payloads(dbname, pending, pending_deliveries, window):
+                        notify_cr.execute("SELECT pg_notify(%s, %s)", [NOTIFY_CHANNEL, payload])
+        pending_deliveries = cr.postcommit.data['order_summary_api.changed_deliveries']
+        for product_id in product_ids:
+            pending.setdefault(product_id, set()).add(column)
+            if delivery_ids and delivery_ids.get(product_id):
+                pending_deliveries.setdefault(product_id, set()).update(delivery_ids[product_id])
+
+    @api.model
+    def _broadcast_summary(self, changes, deliveries=None):
+        """
+        Sends the changed quantity fields of ``changes`` ({product_id:
+        columns}) as one sequence-numbered delta, on the bus and to the
+        subscribed WebSocket clients. Rows changed by deliveries
+        (``deliveries``, {product_id: picking ids}) list them in
+        ``delivery_ids``, which is what delivery subscriptions match on.
+
+        The sequence number is drawn under UPDATE_SEQ_LOCK, held until the
+        commit, so sequence numbers follow commit order and
+        ``_read_changes_since`` never skips an update. The WebSocket message
+        is sent once the stamps are committed, as the bus does.
+        """
+        if not changes:
+            return
+        cr = self.env.cr
+        seq = self._next_update_seq()
+        # Lock the lines in product order, as _apply_deltas does.
+        cr.execute("""
+            WITH locked AS (
+                SELECT id FROM order_summary_line
+                WHERE product_id = ANY(%s)
+                ORDER BY product_id
+                FOR UPDATE
+            )
+            UPDATE order_summary_line osl SET seq = %s
+            FROM locked
+            WHERE osl.id = locked.id
+            RETURNING osl.product_id, {columns}
+        """.format(columns=", ".join(f"osl.{column}" for column in SUMMARY_QTY_FIELDS)), [sorted(changes), seq])
+        payload = []
+        for row in cr.dictfetchall():
+            delta = {'product_id': row['product_id']}
+            for column in changes[row['product_id']]:
+                delta[SUMMARY_API_FIELDS[column]] = float(row[column])
+            if deliveries and deliveries.get(row['product_id']):
+                delta['delivery_ids'] = sorted(deliveries[row['product_id']])
+            payload.append(delta)
+        self.invalidate_model(['seq'])
+        if payload:
+            channel = (cr.dbname, 'order_summary_updates')
+            message = {
+                'type': 'stock_update',
+                'seq': seq,
+                'payload': payload,
+            }
+            start = time.perf_counter()
+            self.env['bus.bus']._sendone(channel, 'stock_update', message)
+            BROADCAST_DURATION.observe(time.perf_counter() - start, target='bus')
+
+            @cr.postcommit.add
+            def broadcast_update():
+                OrderSummaryWebSocket.broadcast_update(message)
+                BROADCASTS.inc()
+
+    @api.model
+    def _next_update_seq(self):
+        """
+        Draws the sequence number of a real-time update, holding
+        UPDATE_SEQ_LOCK until the end of the transaction: the transactions
+        stamping lines commit one at a time, in sequence order. Take it
+        before any lock on order_summary_line.
+        """
+        self.env.cr.execute("SELECT pg_advisory_xact_lock(%s)", [UPDATE_SEQ_LOCK])
+        self.env.cr.execute("SELECT nextval('order_summary_update_seq')")
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _get_update_seq(self):
+        """Sequence number of the last update visible to this transaction."""
+        self.env.cr.execute("SELECT COALESCE(MAX(seq), 0) FROM order_summary_line")
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _read_changes_since(self, since):
+        """
+        Returns the current sequence number and the full quantities of every
+        line updated after ``since``, for clients catching up after missing
+        real-time messages.
+        """
+        cr = self.env.cr
+        current = self._get_update_seq()
+        cr.execute("""
+            SELECT product_id, product_tmpl_id AS template_id, {fields}
+            FROM order_summary_line
+            WHERE seq > %s
+            ORDER BY seq, product_id
+        """.format(fields=", ".join(
+            f"{column}::float AS {name}" for column, name in SUMMARY_API_FIELDS.items()
+        )), [since])
+        return current, cr.dictfetchall()
+
+    # --- Incremental maintenance ---
+
+    @api.model
+    def _apply_deltas(self, column, deltas, delivery_ids=None):
+        """
+        Adds ``deltas`` ({product_id: quantity}) to ``column`` in a single upsert.
+        Runs inside the caller's transaction, so a rollback discards the delta too.
+        ``delivery_ids`` ({product_id: picking ids}) are the deliveries behind
+        the deltas, announced with the real-time update.
+
+        Rows are upserted, hence locked, in product order: concurrent
+        transactions touching overlapping products then queue on the first
+        common row instead of deadlocking.
+        """
+        if column not in SUMMARY_QTY_FIELDS:
+            raise ValueError(f"Unknown summary column: {column}")
+        deltas = dict(sorted((product_id, qty) for product_id, qty in deltas.items() if product_id and qty))
+        if not deltas:
+            return
+
+        values = ", ".join("d.quantity" if name == column else "0" for name in SUMMARY_QTY_FIELDS)
+        query = """
+            INSERT INTO order_summary_line (product_id, product_tmpl_id, {columns})
+            SELECT pp.id, pp.product_tmpl_id, {values}
+            FROM unnest(%(product_ids)s::int[], %(quantities)s::numeric[]) AS d(product_id, quantity)
+            JOIN product_product pp ON (pp.id = d.product_id)
+            ORDER BY d.product_id
+            ON CONFLICT (product_id) DO UPDATE
+            SET {column} = order_summary_line.{column} + EXCLUDED.{column}
+            RETURNING product_id
+        """.format(columns=", ".join(SUMMARY_QTY_FIELDS), values=values, column=column)
+        self.env.cr.execute(query, {
+            'product_ids': list(deltas),
+            'quantities': list(deltas.values()),
+        })
+        product_ids = [row[0] for row in self.env.cr.fetchall()]
+        self.invalidate_model()
+        self._bump_summary_version()
+        self._notify_summary_change(column, product_ids, delivery_ids)
+
+    @api.model
+    def _delivered_quantities(self, move_ids):
+        """
+        Returns {product_id: quantity} for the done outgoing moves among
+        ``move_ids``, and {product_id: picking ids} of their deliveries.
+        """
+        if not move_ids:
+            return {}, {}
+        self.env['stock.move'].flush_model()
+        self.env['stock.picking'].flush_model()
+        self.env.cr.execute("""
+            SELECT sm.product_id, SUM(sm.quantity), array_agg(DISTINCT sm.picking_id)
+            FROM stock_move sm
+            JOIN stock_picking sp ON (sm.picking_id = sp.id)
+            JOIN stock_picking_type spt ON (spt.id = sp.picking_type_id AND spt.code = 'outgoing')
+            WHERE sm.id = ANY(%(move_ids)s)
+              AND sm.state = 'done'
+            GROUP BY sm.product_id
+        """, {'move_ids': list(move_ids)})
+        rows = self.env.cr.fetchall()
+        return {product_id: qty for product_id, qty, _pickings in rows}, {
+            product_id: picking_ids for product_id, _qty, picking_ids in rows
+        }
+
+    # --- Full rebuild / verification ---
+
+    @api.model
+    def rebuild(self):
+        """Recomputes the whole table from the source documents."""
+        self.env.flush_all()
+        cr = self.env.cr
+        # Every line counts as changed, so resyncing clients reload them all.
+        # Drawn first: the broadcasts wait for the lock it takes.
+        seq = self._next_update_seq()
+        # Block concurrent deltas (but not readers) while the table is replaced.
+        cr.execute("LOCK TABLE order_summary_line IN EXCLUSIVE MODE")
+        cr.execute("DELETE FROM order_summary_line")
+        cr.execute("""
+            INSERT INTO order_summary_line (product_id, product_tmpl_id, seq, {columns})
+            SELECT product_id, product_tmpl_id, %s, {columns} FROM ({query}) live
+        """.format(columns=", ".join(SUMMARY_QTY_FIELDS), query=_LIVE_SUMMARY_QUERY), [seq])
+        count = cr.rowcount
+        self.invalidate_model()
+        self._bump_summary_version()
+        _logger.info("Order summary table rebuilt with %s lines", count)
+        return count
+
+    @api.model
+    def verify(self, repair=False):
+        """
+        Compares the persisted table with a live recompute and returns the
+        mismatching lines. With ``repair=True`` the table is rebuilt when
+        any drift is found.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT
+                COALESCE(live.product_id, osl.product_id) AS product_id,
+                {pairs}
+            FROM ({query}) live
+            FULL OUTER JOIN order_summary_line osl ON (osl.product_id = live.product_id)
+            WHERE {mismatch}
+        """.format(
+            query=_LIVE_SUMMARY_QUERY,
+            pairs=", ".join(
+                f"COALESCE(live.{name}, 0) AS expected_{name}, COALESCE(osl.{name}, 0) AS stored_{name}"
+                for name in SUMMARY_QTY_FIELDS
+            ),
+            mismatch=" OR ".join(
+                f"COALESCE(live.{name}, 0) <> COALESCE(osl.{name}, 0)" for name in SUMMARY_QTY_FIELDS
+            ),
+        ))
+        mismatches = self.env.cr.dictfetchall()
+        if mismatches:
+            _logger.warning("Order summary table has drifted on %s products", len(mismatches))
+            if repair:
+                self.rebuild()
+        return mismatches
+
+    @api.model
+    def _cron_verify(self):
+        self.verify(repair=True)
+
+    # --- Read path ---
+
+    @api.model
+    def _get_statement_timeout(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'order_summary_api.statement_timeout_ms', DEFAULT_STATEMENT_TIMEOUT_MS,
+        ))
+
+    @api.model
+    def _fetch_summary(self, query, params, filters):
+        """
+        Runs a summary read and returns its rows as dicts. Reads slower than
+        order_summary_api.slow_query_ms are logged with their ``filters`` and
+        the EXPLAIN plan of the query.
+
+        The query is run through a statement prepared on the connection, so
+        that repeated reads of the same shape skip parsing and planning.
+        """
+        cr = self.env.cr
+        start = time.perf_counter()
+        query, params = prepared_statements.prepare(cr, query, params)
+        cr.execute(query, params)
+        rows = cr.dictfetchall()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        threshold = int(self.env['ir.config_parameter'].sudo().get_param(
+            'order_summary_api.slow_query_ms', DEFAULT_SLOW_QUERY_MS,
+        ))
+        if threshold and elapsed_ms >= threshold:
+            SLOW_QUERIES.inc()
+            cr.execute("EXPLAIN " + query, params)
+            _slow_query_logger.warning(
+                "Slow order summary query: %.0f ms, %s rows, filters %s\n%s",
+                elapsed_ms, len(rows), filters, "\n".join(row[0] for row in cr.fetchall()),
+            )
+        return rows
+
+    @contextmanager
+    def _read_guard(self):
+        """
+        Runs the summary reads of the block read-only and under the
+        configured statement_timeout, so that a runaway query is cancelled
+        instead of holding a worker. The settings live in a savepoint that
+        is rolled back afterwards, which restores the caller's transaction
+        as it was, cancelled query or not.
+        """
+        cr = self.env.cr
+        savepoint = cr.savepoint(flush=False)
+        try:
+            cr.execute(
+                "SELECT set_config('transaction_read_only', 'on', true), set_config('statement_timeout', %s, true)",
+                [f"{self._get_statement_timeout()}ms"],
+            )
+            yield
+        finally:
+            savepoint.close(rollback=True)
+
+    @api.model
+    def _summary_query(self, product_template_ids=None, delivery_ids=None, after=None, limit=None, ordered=True,
+                       date_from=None, date_to=None, company_ids=None):
+        """
+        Builds the summary SELECT and its parameters.
+
+        Rows are ordered by (template name, default code, product id), which
+        is also the keyset used for pagination: ``after`` is the product id of
+        the last row of the previous page, and the next page starts strictly
+        after that row's sort key.
+
+        Delivered quantities restricted to specific deliveries cannot be
+        answered from per-variant totals, so with ``delivery_ids`` only that
+        column is aggregated live, over the moves of those pickings.
+
+        With ``date_from``, ``date_to`` (both included) or ``company_ids``,
+        quantities come from the daily pre-aggregate of order.summary.daily
+        over that period instead of the all-time totals.
+
+        Quantities are returned as floats, so that rows serialize without
+        any per-value conversion.
+        """
+        query = """
+            SELECT
+                pt.id AS template_id,
+                pt.name AS template_name,
+                pp.id AS product_id,
+                pp.default_code,
+                COALESCE(osl.ordered_qty, 0)::float AS ordered_quantity,
+                COALESCE(osl.manufactured_qty, 0)::float AS manufactured_quantity,
+                {delivered_column}::float AS delivered_quantity
+            FROM
+                product_product pp
+            JOIN
+                product_template pt ON (pp.product_tmpl_id = pt.id)
+            LEFT JOIN
+                {summary_table} osl ON (osl.product_id = pp.id)
+            {join_deliveries}
+            {where_clause}
+            {order_clause}
+            {limit_clause}
+        """
+        delivered_column = "COALESCE(osl.delivered_qty, 0)"
+        summary_table = "order_summary_line"
+        join_deliveries = ""
+        conditions = []
+        params = {}
+        move_conditions = []
+
+        if date_from or date_to or company_ids:
+            range_query, params = self.env['order.summary.daily']._range_query(date_from, date_to, company_ids)
+            summary_table = f"({range_query})"
+            if date_from:
+                move_conditions.append("sm.date >= %(date_from)s")
+                params['date_from'] = date_from
+            if date_to:
+                move_conditions.append("sm.date < %(date_stop)s")
+                params['date_stop'] = date_to + timedelta(days=1)
+            if company_ids:
+                move_conditions.append("sm.company_id = ANY(%(company_ids)s::int[])")
+                params['company_ids'] = list(company_ids)
+
+        if product_template_ids:
+            conditions.append("pt.id IN (SELECT unnest(%(template_ids)s::int[]))")
+            params['template_ids'] = list(product_template_ids)
+        if delivery_ids:
+            # Driven by the requested pickings: only their moves are read,
+            # through the index on stock_move.picking_id.
+            delivered_column = "COALESCE(dq.quantity, 0)"
+            join_deliveries = """
+            LEFT JOIN (
+                SELECT sm.product_id, SUM(sm.quantity) AS quantity
+                FROM (SELECT DISTINCT unnest(%(delivery_ids)s::int[]) AS id) delivery
+                JOIN stock_picking sp ON (sp.id = delivery.id)
+                JOIN stock_picking_type spt ON (spt.id = sp.picking_type_id AND spt.code = 'outgoing')
+                JOIN stock_move sm ON (sm.picking_id = sp.id AND sm.state = 'done')
+                {move_where}
+                GROUP BY sm.product_id
+            ) dq ON (dq.product_id = pp.id)
+            """.format(move_where=("WHERE " + " AND ".join(move_conditions)) if move_conditions else "")
+            params['delivery_ids'] = list(delivery_ids)
+        if after:
+            conditions.append("""
+                (pt.name, COALESCE(pp.default_code, ''), pp.id) > (
+                    SELECT pt_after.name, COALESCE(pp_after.default_code, ''), pp_after.id
+                    FROM product_product pp_after
+                    JOIN product_template pt_after ON (pp_after.product_tmpl_id = pt_after.id)
+                    WHERE pp_after.id = %(after)s
+                )
+            """)
+            params['after'] = after
+
+        limit_clause = ""
+        if limit:
+            limit_clause = "LIMIT %(limit)s"
+            params['limit'] = limit
+
+        final_query = query.format(
+            delivered_column=delivered_column,
+            summary_table=summary_table,
+            join_deliveries=join_deliveries,
+            where_clause=("WHERE " + " AND ".join(conditions)) if conditions else "",
+            order_clause="ORDER BY pt.name, COALESCE(pp.default_code, ''), pp.id" if ordered else "",
+            limit_clause=limit_clause,
+        )
+        return final_query, params
+
+    @api.model
+    def _read_summary(self, product_template_ids=None, delivery_ids=None, after=None, limit=None,
+                      date_from=None, date_to=None, company_ids=None):
+        """
+        Returns one row per product variant with its ordered, manufactured and
+        delivered quantities, read from the persisted tables.
+        """
+        query, params = self._summary_query(product_template_ids, delivery_ids, after=after, limit=limit,
+                                            date_from=date_from, date_to=date_to, company_ids=company_ids)
+        return self._fetch_summary(query, params, {
+            'product_template_ids': product_template_ids, 'delivery_ids': delivery_ids, 'after': after,
+            'limit': limit, 'date_from': date_from, 'date_to': date_to, 'company_ids': company_ids,
+        })
+
+    @api.model
+    def _read_grouped_summary(self, group_by, product_template_ids=None, delivery_ids=None,
+                              date_from=None, date_to=None, company_ids=None):
+        """
+        Aggregates the summary at the levels listed in ``group_by`` (any of
+        SUMMARY_GROUP_LEVELS) in a single GROUPING SETS query.
+
+        Every row carries its ``group`` level; the key columns of the other
+        levels are null. Rows come ordered by level, then by key.
+        """
+        levels = [level for level in SUMMARY_GROUP_LEVELS if level in group_by]
+        if not levels:
+            raise ValueError(f"Unknown group_by levels: {group_by}")
+        base_query, params = self._summary_query(product_template_ids, delivery_ids, ordered=False,
+                                                 date_from=date_from, date_to=date_to, company_ids=company_ids)
+
+        grouping_sets = {
+            'variant': "(s.product_id, s.default_code, s.template_id, s.template_name, pt.categ_id, pc.complete_name)",
+            'template': "(s.template_id, s.template_name, pt.categ_id, pc.complete_name)",
+            'category': "(pt.categ_id, pc.complete_name)",
+            'total': "()",
+        }
+        # The most detailed key grouped in a row tells its level.
+        level_keys = {'variant': "s.product_id", 'template': "s.template_id", 'category': "pt.categ_id"}
+        keyed_levels = [(index, level) for index, level in enumerate(levels) if level in level_keys]
+        level_case = "'total'"
+        # A lone total is a single row; name the column rather than a bare
+        # constant, which ORDER BY would read as a column position.
+        level_order = '"group"'
+        if keyed_levels:
+            level_case = "CASE {} ELSE 'total' END".format(" ".join(
+                f"WHEN GROUPING({level_keys[level]}) = 0 THEN '{level}'" for _index, level in keyed_levels
+            ))
+            level_order = "CASE {} ELSE {} END".format(" ".join(
+                f"WHEN GROUPING({level_keys[level]}) = 0 THEN {index}" for index, level in keyed_levels
+            ), len(levels))
+        # SELECT and ORDER BY may only use columns grouped by at least one of
+        # the sets; keys of levels that were not requested are plain nulls.
+        key_columns = {
+            'category_id': "pt.categ_id",
+            'category_name': "pc.complete_name",
+            'template_id': "s.template_id",
+            'template_name': "s.template_name",
+            'product_id': "s.product_id",
+            'default_code': "s.default_code",
+        }
+        order_keys = ["pc.complete_name", "s.template_name", "s.template_id", "s.default_code", "s.product_id"]
+        if 'variant' not in levels:
+            key_columns.update(product_id="NULL", default_code="NULL")
+            order_keys = order_keys[:3]
+        if 'variant' not in levels and 'template' not in levels:
+            key_columns.update(template_id="NULL", template_name="NULL")
+            order_keys = order_keys[:1]
+        if levels == ['total']:
+            key_columns.update(category_id="NULL", category_name="NULL")
+            order_keys = []
+        query = """
+            SELECT
+                {level_case} AS "group",
+                {key_columns},
+                COUNT(*) AS variant_count,
+                SUM(s.ordered_quantity) AS ordered_quantity,
+                SUM(s.manufactured_quantity) AS manufactured_quantity,
+                SUM(s.delivered_quantity) AS delivered_quantity
+            FROM ({base_query}) s
+            JOIN product_template pt ON (pt.id = s.template_id)
+            LEFT JOIN product_category pc ON (pc.id = pt.categ_id)
+            GROUP BY GROUPING SETS ({grouping_sets})
+            ORDER BY {level_order}{order_keys}
+        """.format(
+            level_case=level_case,
+            key_columns=", ".join(f"{expression} AS {name}" for name, expression in key_columns.items()),
+            level_order=level_order,
+            order_keys="".join(", " + key for key in order_keys),
+            base_query=base_query,
+            grouping_sets=", ".join(grouping_sets[level] for level in levels),
+        )
+        return self._fetch_summary(query, params, {
+            'group_by': levels, 'product_template_ids': product_template_ids, 'delivery_ids': delivery_ids,
+            'date_from': date_from, 'date_to': date_to, 'company_ids': company_ids,
+        })
+
+    @api.model
+    def _read_batch_summary(self, filter_sets):
+        """
+        Evaluates many filter sets, {name: (product_template_ids,
+        delivery_ids)}, in a single statement and returns {name: rows}, each
+        list being what _read_summary returns for those filters.
+
+        The filter sets are passed as one JSON array, turned into a relation
+        by jsonb_to_recordset. The variants of a filtered set come from its
+        unnested templates, through the product_tmpl_id index; a set without
+        templates takes every variant, in a branch of its own. An empty
+        filter means no restriction, as on the single read.
+        """
+        query = """
+            WITH filter_set AS (
+                SELECT fs.name, fs.template_ids, fs.delivery_ids
+                FROM jsonb_to_recordset(%(filter_sets)s::jsonb)
+                    AS fs(name text, template_ids int[], delivery_ids int[])
+            ),
+            set_delivered AS (
+                SELECT fs.name, sm.product_id, SUM(sm.quantity) AS quantity
+                FROM filter_set fs
+                CROSS JOIN LATERAL (SELECT DISTINCT unnest(fs.delivery_ids) AS id) delivery
+                JOIN stock_picking sp ON (sp.id = delivery.id)
+                JOIN stock_picking_type spt ON (spt.id = sp.picking_type_id AND spt.code = 'outgoing')
+                JOIN stock_move sm ON (sm.picking_id = sp.id AND sm.state = 'done')
+                GROUP BY fs.name, sm.product_id
+            ),
+            set_variant AS (
+                SELECT fs.name, fs.delivery_ids IS NULL AS all_deliveries, pp.id, pp.product_tmpl_id, pp.default_code
+                FROM filter_set fs
+                CROSS JOIN LATERAL (SELECT DISTINCT unnest(fs.template_ids) AS id) template
+                JOIN product_product pp ON (pp.product_tmpl_id = template.id)
+                UNION ALL
+                SELECT fs.name, fs.delivery_ids IS NULL, pp.id, pp.product_tmpl_id, pp.default_code
+                FROM filter_set fs
+                CROSS JOIN product_product pp
+                WHERE fs.template_ids IS NULL
+            )
+            SELECT
+                sv.name AS filter_name,
+                pt.id AS template_id,
+                pt.name AS template_name,
+                sv.id AS product_id,
+                sv.default_code,
+                COALESCE(osl.ordered_qty, 0)::float AS ordered_quantity,
+                COALESCE(osl.manufactured_qty, 0)::float AS manufactured_quantity,
+                (CASE WHEN sv.all_deliveries THEN COALESCE(osl.delivered_qty, 0)
+                      ELSE COALESCE(sd.quantity, 0) END)::float AS delivered_quantity
+            FROM
+                set_variant sv
+            JOIN
+                product_template pt ON (sv.product_tmpl_id = pt.id)
+            LEFT JOIN
+                order_summary_line osl ON (osl.product_id = sv.id)
+            LEFT JOIN
+                set_delivered sd ON (sd.name = sv.name AND sd.product_id = sv.id)
+            ORDER BY sv.name, pt.name, COALESCE(sv.default_code, ''), sv.id
+        """
+        params = {'filter_sets': json.dumps([{
+            'name': name,
+            'template_ids': list(template_ids) or None,
+            'delivery_ids': list(delivery_ids) or None,
+        } for name, (template_ids, delivery_ids) in filter_sets.items()])}
+
+        results = {name: [] for name in filter_sets}
+        for row in self._fetch_summary(query, params, {'filter_sets': len(filter_sets)}):
+            results[row.pop('filter_name')].append(row)
+        return results
+
+    @api.model
+    def _count_batch_rows(self, filter_sets):
+        """
+        Returns the number of rows _read_batch_summary would return for
+        ``filter_sets``: the variants of its templates for a filtered set,
+        the whole catalogue for a set without templates.
+        """
+        template_ids = {template_id for template_ids, _ in filter_sets.values() for template_id in template_ids}
+        variant_counts = {}
+        if template_ids:
+            self.env.cr.execute("""
+                SELECT product_tmpl_id, COUNT(*)
+                FROM product_product
+                WHERE product_tmpl_id = ANY(%s)
+                GROUP BY product_tmpl_id
+            """, [sorted(template_ids)])
+            variant_counts = dict(self.env.cr.fetchall())
+        catalogue_size = 0
+        if any(not template_ids for template_ids, _ in filter_sets.values()):
+            self.env.cr.execute("SELECT COUNT(*) FROM product_product")
+            catalogue_size = self.env.cr.fetchone()[0]
+        return sum(
+            sum(variant_counts.get(template_id, 0) for template_id in set(template_ids)) if template_ids
+            else catalogue_size
+            for template_ids, _ in filter_sets.values()
+        )
+
+    @api.model
+    def _stream_summary(self, product_template_ids=None, delivery_ids=None, batch_size=2000,
+                        date_from=None, date_to=None, company_ids=None):
+        """
+        Yields lists of summary rows, ``batch_size`` at a time, from a
+        server-side cursor so memory stays flat regardless of catalogue size.
+
+        The generator is consumed after the HTTP handler has returned and its
+        cursor is closed, so it reads through a cursor of its own, in a
+        read-only transaction where every fetch is bounded by the statement
+        timeout.
+        """
+        with self.env.registry.cursor() as cr:
+            cr.execute("SET TRANSACTION READ ONLY")
+            summary = self.with_env(self.env(cr=cr))
+            cr.execute("SELECT set_config('statement_timeout', %s, true)", [f"{summary._get_statement_timeout()}ms"])
+            query, params = summary._summary_query(product_template_ids, delivery_ids,
+                                                   date_from=date_from, date_to=date_to, company_ids=company_ids)
+            with cr._cnx.cursor('order_summary_stream') as named_cursor:
+                named_cursor.itersize = batch_size
+                named_cursor.execute(query, params)
+                columns = None
+                while True:
+                    rows = named_cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    if columns is None:
+                        columns = [column[0] for column in named_cursor.description]
+                    yield [dict(zip(columns, row)) for row in rows]
@@ -0,0 +1,48 @@
+# order_summary_api/models/product.py
+from odoo import api, models
+
+
+class ProductCategory(models.Model):
+    _inherit = 'product.category'
+
+    # Category rollups are keyed and ordered on the complete name, which
+    # follows the name of the category and of all its parents.
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals or 'parent_id' in vals:
+            self.env['order.summary.line'].sudo()._bump_summary_version()
+        return res
+
+
+class ProductTemplate(models.Model):
+    _inherit = 'product.template'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals or 'categ_id' in vals:
+            self.env['order.summary.line'].sudo()._bump_summary_version()
+        return res
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    # Every variant is a row of the summary (with zeros when it has no
+    # activity), so adding, renaming or removing one changes the output.
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        products = super().create(vals_list)
+        self.env['order.summary.line'].sudo()._bump_summary_version()
+        return products
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'default_code' in vals or 'product_tmpl_id' in vals:
+            self.env['order.summary.line'].sudo()._bump_summary_version()
+        return res
+
+    def unlink(self):
+        self.env['order.summary.line'].sudo()._bump_summary_version()
+        return super().unlink()
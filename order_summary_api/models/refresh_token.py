@@ -0,0 +1,94 @@
+# order_summary_api/models/refresh_token.py
+import hashlib
+import secrets
+import uuid
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.exceptions import AccessDenied
+
+# Default lifetime of a refresh token, overridable through the
+# order_summary_api.refresh_token_ttl_days system parameter.
+DEFAULT_REFRESH_TOKEN_TTL_DAYS = 30
+
+
+def _hash_token(raw_token):
+    return hashlib.sha256(raw_token.encode()).hexdigest()
+
+
+class OrderSummaryRefreshToken(models.Model):
+    """
+    Long-lived API refresh tokens.
+
+    Only a SHA-256 digest of each token is stored. Tokens are single use:
+    every refresh revokes the presented token and issues its successor in the
+    same family. Presenting an already rotated token means it leaked, so the
+    whole family is revoked.
+    """
+    _name = 'order.summary.refresh.token'
+    _description = 'Order Summary API Refresh Token'
+    _log_access = False
+
+    token_hash = fields.Char(required=True, index=True)
+    family = fields.Char(required=True, index=True)
+    user_id = fields.Many2one('res.users', required=True, ondelete='cascade', index=True)
+    issued_at = fields.Datetime(required=True, default=fields.Datetime.now)
+    expires_at = fields.Datetime(required=True)
+    revoked = fields.Boolean(default=False)
+
+    _sql_constraints = [
+        ('token_hash_uniq', 'unique(token_hash)', 'Refresh token digests must be unique.'),
+    ]
+
+    @api.model
+    def _issue(self, user_id, family=None):
+        """Creates a refresh token for ``user_id`` and returns its raw value."""
+        ttl_days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'order_summary_api.refresh_token_ttl_days', DEFAULT_REFRESH_TOKEN_TTL_DAYS,
+        ))
+        raw_token = secrets.token_urlsafe(48)
+        self.sudo().create({
+            'token_hash': _hash_token(raw_token),
+            'family': family or uuid.uuid4().hex,
+            'user_id': user_id,
+            'expires_at': fields.Datetime.now() + timedelta(days=ttl_days),
+        })
+        return raw_token
+
+    @api.model
+    def _rotate(self, raw_token):
+        """
+        Consumes ``raw_token`` and returns (user, new raw token).
+        Raises AccessDenied for unknown, expired or revoked tokens.
+        """
+        token = self.sudo().search([('token_hash', '=', _hash_token(raw_token))], limit=1)
+        if not token:
+            raise AccessDenied()
+        # Serialize concurrent refreshes of the same token.
+        self.env.cr.execute(
+            "SELECT revoked FROM order_summary_refresh_token WHERE id = %s FOR UPDATE", [token.id],
+        )
+        if self.env.cr.fetchone()[0]:
+            self.sudo().search([('family', '=', token.family)]).write({'revoked': True})
+            raise AccessDenied()
+        token.invalidate_recordset(['revoked'])
+        if token.expires_at < fields.Datetime.now() or not token.user_id.active:
+            raise AccessDenied()
+        token.revoked = True
+        return token.user_id, self._issue(token.user_id.id, family=token.family)
+
+    @api.model
+    def _revoke(self, raw_token):
+        """Revokes ``raw_token`` and every token rotated from the same login."""
+        token = self.sudo().search([('token_hash', '=', _hash_token(raw_token))], limit=1)
+        if token:
+            self.sudo().search([('family', '=', token.family)]).write({'revoked': True})
+        return bool(token)
+
+    @api.model
+    def _cron_gc(self):
+        """
+        Removes expired tokens. Revoked ones are kept until they expire so
+        that a replayed rotated token still revokes its family.
+        """
+        self.sudo().search([('expires_at', '<', fields.Datetime.now())]).unlink()
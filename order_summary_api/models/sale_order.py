@@ -0,0 +1,24 @@
+# order_summary_api/models/sale_order.py
+from odoo import models
+
+
+class SaleOrder(models.Model):
+    _inherit = 'sale.order'
+
+    def write(self, vals):
+        # Moving an order to another day or company moves its lines between
+        # daily aggregates (confirming an order resets its date, for one).
+        if 'date_order' not in vals and 'company_id' not in vals:
+            return super().write(vals)
+        daily = self.env['order.summary.daily'].sudo()
+        daily._mark_dirty(self.mapped('date_order'))
+        res = super().write(vals)
+        daily._mark_dirty(self.mapped('date_order'))
+        self.env['order.summary.line'].sudo()._bump_summary_version()
+        return res
+
+    def unlink(self):
+        # Lines are deleted with their order by the ON DELETE CASCADE, without
+        # going through SaleOrderLine.unlink().
+        self.order_line._push_order_summary_deltas(sign=-1)
+        return super().unlink()
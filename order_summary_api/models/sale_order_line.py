@@ -0,0 +1,43 @@
+# order_summary_api/models/sale_order_line.py
+from collections import defaultdict
+
+from odoo import api, models
+
+
+# Fields changing what a line adds to the ordered totals. product_uom_qty is
+# also recomputed from the packaging quantity, a stored compute that does not
+# go through write(), so its dependencies are tracked as well.
+ORDER_SUMMARY_FIELDS = ('product_id', 'product_uom_qty', 'product_packaging_id', 'product_packaging_qty',
+                        'display_type')
+
+
+class SaleOrderLine(models.Model):
+    _inherit = 'sale.order.line'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines._push_order_summary_deltas(sign=1)
+        return lines
+
+    def write(self, vals):
+        tracked = any(field in vals for field in ORDER_SUMMARY_FIELDS)
+        if tracked:
+            self._push_order_summary_deltas(sign=-1)
+        res = super().write(vals)
+        if tracked:
+            self._push_order_summary_deltas(sign=1)
+        return res
+
+    def unlink(self):
+        self._push_order_summary_deltas(sign=-1)
+        return super().unlink()
+
+    def _push_order_summary_deltas(self, sign):
+        """Adds (sign=1) or removes (sign=-1) these lines from the ordered totals."""
+        deltas = defaultdict(float)
+        for line in self:
+            if line.product_id:
+                deltas[line.product_id.id] += sign * line.product_uom_qty
+        self.env['order.summary.line'].sudo()._apply_deltas('ordered_qty', deltas)
+        self.env['order.summary.daily'].sudo()._mark_dirty(self.order_id.mapped('date_order'))
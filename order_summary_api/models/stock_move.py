@@ -1,49 +1,20 @@
 # order_summary_api/models/stock_move.py
-from odoo import models, api, http
-
-# Import the controller class to access its data-fetching method.
-# This approach couples the model to the controller. A more decoupled design
-# would move the _get_order_summary_data logic to a shared mixin or model.
-from odoo.addons.order_summary_api.controllers.api_controller import OrderSummaryAPI
+from odoo import models
 
 
 class StockMove(models.Model):
     _inherit = 'stock.move'
 
-    def button_validate(self, cancel_backorder=False):
-        # Identify moves that are about to be marked as 'done'
-        moves_to_notify = self.filtered(lambda m: m.state not in ('done', 'cancel'))
-
-        res = super(StockMove, self).button_validate(cancel_backorder=cancel_backorder)
-
-        # Filter for moves that successfully completed and are relevant for our summary
-        succeeded_moves = moves_to_notify.filtered(
-            lambda m: m.state == 'done' and m.picking_id and m.picking_type_code == 'outgoing'
-        )
-
-        if not succeeded_moves:
-            return res
-
-        # Get the unique product templates affected by these moves
-        product_variants = succeeded_moves.mapped('product_id')
-        template_ids = product_variants.mapped('product_tmpl_id').ids
-
-        if not template_ids:
-            return res
-
-        # Re-fetch the summary data ONLY for the affected products.
-        # This is a lightweight payload that the client can use to update specific rows.
-        # We instantiate the controller to call the method.
-        api_controller = OrderSummaryAPI()
-        updated_summary_data = api_controller._get_order_summary_data(product_template_ids=template_ids)
-
-        if updated_summary_data:
-            # Broadcast the updated lines on a specific channel
-            channel = (self.env.cr.dbname, 'order_summary_updates')
-            message = {
-                'type': 'stock_update',
-                'payload': updated_summary_data,
-            }
-            self.env['bus.bus']._sendone(channel, 'stock_update', message)
-
-        return res
\ No newline at end of file
+    def _action_done(self, cancel_backorder=False):
+        already_done = self.filtered(lambda m: m.state == 'done')
+        moves = super()._action_done(cancel_backorder=cancel_backorder)
+
+        # Push the newly delivered quantities into the persisted summary. The
+        # summary line queues the real-time broadcast for after commit.
+        summary = self.env['order.summary.line'].sudo()
+        quantities, delivery_ids = summary._delivered_quantities((moves - already_done).ids)
+        summary._apply_deltas('delivered_qty', quantities, delivery_ids=delivery_ids)
+        # Moves are normally done today, which is read live anyway; backdated
+        # ones change an already rolled up day.
+        self.env['order.summary.daily'].sudo()._mark_dirty((moves - already_done).mapped('date'))
+        return moves
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# order_summary_api/scripts/load_test.py
+"""
+Load generator for the Order Summary API and its real-time channel.
+
+Runs outside Odoo, against a local server only:
+
+    python3 load_test.py --db mydb --login admin --password admin \\
+        --concurrency 16 --duration 60 --filtered-ratio 0.7 \\
+        --subscribers 200 --validate-product-id 42
+
+It logs in through POST /api/v1/login, then for ``--duration`` seconds
+runs ``--concurrency`` HTTP clients calling GET /api/v1/order-summary, a
+share ``--filtered-ratio`` of them filtered on a few product templates.
+Meanwhile ``--subscribers`` WebSocket clients subscribe on port 8765 and,
+when ``--validate-product-id`` is given, a delivery of that product is
+validated (button_validate, over JSON-RPC) every ``--validate-interval``
+seconds to measure the delay until each subscriber hears about it.
+
+It reports throughput, latency percentiles and error rates per request
+kind, and the validation-to-subscriber delays. Besides the standard
+library it only needs ``websockets``, already required by the module.
+"""
+import argparse
+import asyncio
+import http.client
+import ipaddress
+import json
+import math
+import random
+import socket
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlencode, urlparse
+
+WEBSOCKET_PORT = 8765
+
+
+def _percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list, as models/benchmark.py computes it."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(percent * len(sorted_values) / 100) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _ensure_local(url):
+    """Refuses to load anything but a server on this machine."""
+    host = urlparse(url).hostname or ''
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        sys.exit(f"Cannot resolve {host!r}")
+    if not addresses or not all(ipaddress.ip_address(address.split('%')[0]).is_loopback for address in addresses):
+        sys.exit(f"Refusing to run against {host!r}: only a local Odoo server may be load tested.")
+
+
+class OdooClient:
+    """Minimal JSON-RPC client, used to prepare and validate deliveries."""
+
+    def __init__(self, url, db, login, password):
+        self.url = url.rstrip('/')
+        self.db = db
+        self.password = password
+        self.uid = self._call('common', 'login', db, login, password)
+        if not self.uid:
+            sys.exit("JSON-RPC login failed")
+
+    def _call(self, service, method, *args):
+        parsed = urlparse(self.url)
+        connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+        try:
+            connection.request('POST', '/jsonrpc', json.dumps({
+                'jsonrpc': '2.0', 'method': 'call', 'id': 1,
+                'params': {'service': service, 'method': method, 'args': list(args)},
+            }), {'Content-Type': 'application/json'})
+            reply = json.loads(connection.getresponse().read())
+        finally:
+            connection.close()
+        if reply.get('error'):
+            raise RuntimeError(reply['error'].get('data', {}).get('message') or reply['error'])
+        return reply['result']
+
+    def execute(self, model, method, *args, **kwargs):
+        return self._call('object', 'execute_kw', self.db, self.uid, self.password, model, method, list(args), kwargs)
+
+
+class ApiLoad:
+    """Concurrent GET /api/v1/order-summary clients, each on its own keep-alive connection."""
+
+    def __init__(self, url, token, template_ids, filtered_ratio, limit):
+        parsed = urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'}
+        self.template_ids = template_ids
+        self.filtered_ratio = filtered_ratio
+        self.limit = limit
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def _path(self, kind):
+        params = {}
+        if kind == 'filtered':
+            params['product_templates'] = ','.join(map(str, random.sample(
+                self.template_ids, min(len(self.template_ids), random.randint(1, 5)))))
+        if self.limit:
+            params['limit'] = self.limit
+        return '/api/v1/order-summary' + ('?' + urlencode(params) if params else '')
+
+    def _worker(self, deadline):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+        while time.monotonic() < deadline:
+            kind = 'filtered' if self.template_ids and random.random() < self.filtered_ratio else 'unfiltered'
+            start = time.perf_counter()
+            try:
+                connection.request('GET', self._path(kind), headers=self.headers)
+                response = connection.getresponse()
+                response.read()
+                status = str(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                connection.close()
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.latencies[kind].append(elapsed)
+                self.statuses[kind][status] += 1
+        connection.close()
+
+    def run(self, concurrency, duration):
+        deadline = time.monotonic() + duration
+        threads = [threading.Thread(target=self._worker, args=(deadline,), daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def report(self, duration):
+        lines = []
+        for kind in sorted(self.latencies):
+            timings = sorted(self.latencies[kind])
+            statuses = self.statuses[kind]
+            errors = sum(count for status, count in statuses.items() if status != '200')
+            lines.append(
+                f"{kind:>10}: {len(timings)} requests, {len(timings) / duration:.1f} req/s, "
+                f"errors {errors / len(timings):.2%} {dict(statuses)}, "
+                f"p50 {_percentile(timings, 50) * 1000:.1f} ms, p95 {_percentile(timings, 95) * 1000:.1f} ms, "
+                f"p99 {_percentile(timings, 99) * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms"
+            )
+        return lines
+
+
+class Subscribers:
+    """WebSocket subscribers recording when each real-time update reaches them."""
+
+    def __init__(self, count, product_id):
+        self.count = count
+        self.product_id = product_id
+        self.connected = 0
+        self.failed = Counter()
+        # subscriber index -> perf_counter() of each update naming the product
+        self.received = defaultdict(list)
+        self.ready = threading.Event()
+        self._stop = None
+        self._loop = None
+
+    async def _subscriber(self, index):
+        import websockets
+
+        try:
+            async with websockets.connect(f'ws://localhost:{WEBSOCKET_PORT}', max_queue=None) as websocket:
+                subscription = {'type': 'subscribe'}
+                if self.product_id:
+                    subscription['product_ids'] = [self.product_id]
+                await websocket.send(json.dumps(subscription))
+                self.connected += 1
+                async for message in websocket:
+                    received = time.perf_counter()
+                    data = json.loads(message)
+                    if data.get('type') == 'stock_update' and any(
+                        line.get('product_id') == self.product_id for line in data.get('payload') or []
+                    ):
+                        self.received[index].append(received)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.failed[type(e).__name__] += 1
+
+    async def _main(self):
+        self._stop = asyncio.Event()
+        tasks = [asyncio.ensure_future(self._subscriber(index)) for index in range(self.count)]
+        # Give the connections a moment to be established before the load starts.
+        await asyncio.sleep(min(1 + self.count / 200, 10))
+        self.ready.set()
+        await self._stop.wait()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def start(self):
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._main())
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        self.ready.wait()
+
+    def stop(self):
+        if self._loop and self._stop:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(timeout=10)
+
+
+class Validator:
+    """Validates one delivery of a product at a time and remembers when."""
+
+    def __init__(self, odoo, product_id):
+        self.odoo = odoo
+        self.product_id = product_id
+        self.validations = []  # (perf_counter() before button_validate, call duration)
+        picking_type = odoo.execute('stock.picking.type', 'search_read', [('code', '=', 'outgoing')],
+                                    fields=['default_location_src_id'], limit=1)
+        customer = odoo.execute('stock.location', 'search', [('usage', '=', 'customer')], limit=1)
+        if not picking_type or not picking_type[0]['default_location_src_id'] or not customer:
+            sys.exit("No outgoing operation type or customer location to validate deliveries with")
+        self.picking_type_id = picking_type[0]['id']
+        self.location_id = picking_type[0]['default_location_src_id'][0]
+        self.location_dest_id = customer[0]
+
+    def validate_one(self):
+        odoo = self.odoo
+        picking_id = odoo.execute('stock.picking', 'create', {
+            'picking_type_id': self.picking_type_id,
+            'location_id': self.location_id,
+            'location_dest_id': self.location_dest_id,
+            'move_ids': [(0, 0, {
+                'name': 'Order summary load test',
+                'product_id': self.product_id,
+                'product_uom_qty': 1,
+                'location_id': self.location_id,
+                'location_dest_id': self.location_dest_id,
+            })],
+        })
+        odoo.execute('stock.picking', 'action_confirm', [picking_id])
+        move_ids = odoo.execute('stock.move', 'search', [('picking_id', '=', picking_id)])
+        odoo.execute('stock.move', 'write', move_ids, {'quantity': 1, 'picked': True})
+        start = time.perf_counter()
+        result = odoo.execute('stock.picking', 'button_validate', [picking_id])
+        self.validations.append((start, time.perf_counter() - start))
+        if isinstance(result, dict):
+            print(f"warning: button_validate on picking {picking_id} opened {result.get('res_model')}",
+                  file=sys.stderr)
+
+    def run(self, stop, interval):
+        while not stop.wait(interval):
+            try:
+                self.validate_one()
+            except Exception as e:
+                print(f"warning: validation failed: {e}", file=sys.stderr)
+
+
+def _end_to_end_report(validations, subscribers):
+    """Delay from each button_validate call to the first matching update of every subscriber."""
+    delays, missed = [], 0
+    starts = [start for start, _duration in validations]
+    for index in range(subscribers.count):
+        times = sorted(subscribers.received.get(index, []))
+        for position, start in enumerate(starts):
+            end = starts[position + 1] if position + 1 < len(starts) else float('inf')
+            match = next((received for received in times if start <= received < end), None)
+            if match is None:
+                missed += 1
+            else:
+                delays.append(match - start)
+    delays.sort()
+    rpc = sorted(duration for _start, duration in validations)
+    expected = len(starts) * subscribers.count
+    return [
+        f"validations: {len(starts)}, button_validate p50 {_percentile(rpc, 50) * 1000:.0f} ms",
+        f"deliveries to subscribers: {len(delays)}/{expected}, missed {missed / expected if expected else 0:.2%}",
+        f"end-to-end delay: p50 {_percentile(delays, 50) * 1000:.0f} ms, p95 {_percentile(delays, 95) * 1000:.0f} ms, "
+        f"p99 {_percentile(delays, 99) * 1000:.0f} ms, max {(delays[-1] if delays else 0) * 1000:.0f} ms",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--url', default='http://localhost:8069', help="Local Odoo server URL")
+    parser.add_argument('--db', required=True)
+    parser.add_argument('--login', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent HTTP clients")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds of HTTP load")
+    parser.add_argument('--filtered-ratio', type=float, default=0.5,
+                        help="Share of the requests filtered on product templates")
+    parser.add_argument('--limit', type=int, help="Page size of the requests (default: whole summary)")
+    parser.add_argument('--subscribers', type=int, default=0, help="WebSocket subscribers to open")
+    parser.add_argument('--validate-product-id', type=int,
+                        help="Product of the deliveries validated to measure end-to-end delays")
+    parser.add_argument('--validate-interval', type=float, default=5,
+                        help="Seconds between two validations, longer than the broadcast window")
+    args = parser.parse_args()
+    _ensure_local(args.url)
+
+    parsed = urlparse(args.url)
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+    connection.request('POST', '/api/v1/login', json.dumps({
+        'db': args.db, 'login': args.login, 'password': args.password,
+    }), {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    login = json.loads(response.read() or b'{}')
+    connection.close()
+    if response.status != 200 or 'token' not in login:
+        sys.exit(f"Login failed: HTTP {response.status} {login.get('error', '')}")
+
+    odoo = OdooClient(args.url, args.db, args.login, args.password)
+    template_ids = odoo.execute('product.template', 'search', [], limit=200) if args.filtered_ratio else []
+
+    subscribers = None
+    if args.subscribers:
+        subscribers = Subscribers(args.subscribers, args.validate_product_id)
+        subscribers.start()
+        print(f"{subscribers.connected}/{args.subscribers} WebSocket subscribers connected")
+
+    stop = threading.Event()
+    validator = None
+    if args.validate_product_id:
+        validator = Validator(odoo, args.validate_product_id)
+        threading.Thread(target=validator.run, args=(stop, args.validate_interval), daemon=True).start()
+
+    api = ApiLoad(args.url, login['token'], template_ids, args.filtered_ratio, args.limit)
+    print(f"Running {args.concurrency} HTTP clients for {args.duration:.0f}s...")
+    api.run(args.concurrency, args.duration)
+    stop.set()
+    if subscribers:
+        # Let the last broadcasts arrive.
+        time.sleep(2)
+        subscribers.stop()
+
+    print("\nREST API")
+    for line in api.report(args.duration):
+        print("  " + line)
+    if subscribers:
+        print("\nWebSocket")
+        print(f"  connected {subscribers.connected}/{args.subscribers}, failures {dict(subscribers.failed)}")
+        if validator:
+            for line in _end_to_end_report(validator.validations, subscribers):
+                print("  " + line)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,85 +2,249 @@
 
 import { registry } from "@web/core/registry";
 import { useService } from "@web/core/utils/hooks";
-import { Component, onWillStart, onWillUnmount, useState } from "@odoo/owl";
+import { Component, onMounted, onWillStart, onWillUnmount, useRef, useState } from "@odoo/owl";
+
+// Fixed row height (px) is what makes the windowed rendering possible.
+const ROW_HEIGHT = 32;
+// Extra rows rendered above and below the visible window.
+const OVERSCAN = 10;
+// Rows requested per API page.
+const PAGE_SIZE = 500;
 
 class OrderSummaryPopup extends Component {
     setup() {
         this.busService = useService("bus_service");
         this.notification = useService("notification");
+        this.scrollRef = useRef("scroller");
+
+        // Rows live outside the reactive state: with tens of thousands of
+        // lines, proxying each of them would cost more than the rendering.
+        // `renderTick` is bumped whenever they change to trigger a render.
+        this.rows = [];
+        this.rowIndex = new Map(); // product_id -> row
+        this.nextAfter = null;
+        this.lastSeq = 0;
+        this.pendingUpdates = [];
+        this.frameRequest = null;
+
         this.state = useState({
-            summaryLines: [],
             isLoading: true,
+            isLoadingPage: false,
+            hasMore: true,
+            scrollTop: 0,
+            viewportHeight: 600,
+            renderTick: 0,
+            lastUpdate: null,
         });
 
         // The channel must match the one defined in the Python backend.
         // Odoo's bus service automatically uses the current database name.
         this.channelName = 'order_summary_updates';
+        this._onBusNotification = this._onBusNotification.bind(this);
 
         onWillStart(async () => {
             // Add the channel to the bus service to start listening
             this.busService.addChannel(this.channelName);
-            this.busService.addEventListener("notification", this._onBusNotification.bind(this));
-            await this.loadData();
+            this.busService.addEventListener("notification", this._onBusNotification);
+            await this.loadNextPage();
+            this.state.isLoading = false;
+        });
+
+        onMounted(() => {
+            if (this.scrollRef.el) {
+                this.state.viewportHeight = this.scrollRef.el.clientHeight;
+            }
         });
 
         onWillUnmount(() => {
             // Clean up by removing the channel listener
+            this.busService.removeEventListener("notification", this._onBusNotification);
             this.busService.removeChannel(this.channelName);
+            if (this.frameRequest) {
+                cancelAnimationFrame(this.frameRequest);
+            }
         });
     }
 
-    async loadData() {
-        this.state.isLoading = true;
+    // --- Windowing ---
+
+    get visibleRange() {
+        // Read renderTick so that row changes re-render the window.
+        this.state.renderTick;
+        const start = Math.max(Math.floor(this.state.scrollTop / ROW_HEIGHT) - OVERSCAN, 0);
+        const count = Math.ceil(this.state.viewportHeight / ROW_HEIGHT) + 2 * OVERSCAN;
+        return { start, end: Math.min(start + count, this.rows.length) };
+    }
+
+    get visibleRows() {
+        const { start, end } = this.visibleRange;
+        return this.rows.slice(start, end);
+    }
+
+    get topSpacerHeight() {
+        return this.visibleRange.start * ROW_HEIGHT;
+    }
+
+    get bottomSpacerHeight() {
+        return (this.rows.length - this.visibleRange.end) * ROW_HEIGHT;
+    }
+
+    get rowHeight() {
+        return ROW_HEIGHT;
+    }
+
+    get rowCount() {
+        this.state.renderTick;
+        return this.rows.length;
+    }
+
+    templateName(line) {
+        // Translatable names come back as {lang: value} objects.
+        const name = line.template_name;
+        if (name && typeof name === "object") {
+            return name.en_US || Object.values(name)[0] || "";
+        }
+        return name || "";
+    }
+
+    onScroll(ev) {
+        this.state.scrollTop = ev.target.scrollTop;
+        this.state.viewportHeight = ev.target.clientHeight;
+        // Fetch the next page when the user gets within two screens of the end.
+        const remaining = this.rows.length * ROW_HEIGHT - (ev.target.scrollTop + ev.target.clientHeight);
+        if (remaining < 2 * ev.target.clientHeight) {
+            this.loadNextPage();
+        }
+    }
+
+    // --- Data loading ---
+
+    async _fetch(url) {
         // In a real application, the JWT token should be securely managed
         // (e.g., obtained from a login flow and stored in memory or secure storage).
         const jwtToken = localStorage.getItem("jwt_token"); // Example: using localStorage
 
         if (!jwtToken) {
             this.notification.add("Authentication token not found. Please log in.", { type: "danger" });
-            this.state.isLoading = false;
-            return;
+            return null;
         }
 
         try {
-            const response = await fetch('/api/v1/order-summary', {
+            const response = await fetch(url, {
                 headers: { 'Authorization': `Bearer ${jwtToken}` },
             });
-
-            if (response.ok) {
-                this.state.summaryLines = await response.json();
-            } else {
+            if (!response.ok) {
                 const error = await response.json();
                 this.notification.add(`Error: ${error.error || 'Failed to load order summary.'}`, { type: "danger" });
+                return null;
             }
+            return response;
         } catch (err) {
             this.notification.add(`Network or server error: ${err.message}`, { type: "danger" });
+            return null;
+        }
+    }
+
+    async loadNextPage() {
+        if (this.state.isLoadingPage || !this.state.hasMore) {
+            return;
+        }
+        this.state.isLoadingPage = true;
+        try {
+            let url = `/api/v1/order-summary?limit=${PAGE_SIZE}`;
+            if (this.nextAfter) {
+                url += `&after=${this.nextAfter}`;
+            }
+            const response = await this._fetch(url);
+            if (!response) {
+                this.state.hasMore = false;
+                return;
+            }
+            const page = await response.json();
+            if (!this.rows.length) {
+                this.lastSeq = parseInt(response.headers.get("X-Summary-Seq") || "0", 10);
+            }
+            for (const row of page) {
+                this.rowIndex.set(row.product_id, row);
+                this.rows.push(row);
+            }
+            this.nextAfter = response.headers.get("X-Next-After");
+            this.state.hasMore = Boolean(this.nextAfter);
+            this.state.lastUpdate = new Date();
+            this.state.renderTick++;
         } finally {
-            this.state.isLoading = false;
+            this.state.isLoadingPage = false;
+        }
+    }
+
+    async resync() {
+        // Catch up on missed updates with just the lines changed since lastSeq.
+        const response = await this._fetch(`/api/v1/order-summary/changes?since=${this.lastSeq}`);
+        if (!response) {
+            return;
         }
+        const result = await response.json();
+        this._applyUpdates(result.changes);
+        this.lastSeq = Math.max(this.lastSeq, result.seq);
+        this.state.renderTick++;
     }
 
+    // --- Real-time updates ---
+
     _onBusNotification({ detail: notifications }) {
         for (const notif of notifications) {
             // Check if the notification is for our channel and has the correct type
             if (notif.type === 'stock_update' && notif.payload.type === 'stock_update') {
-                const updatedLines = notif.payload.payload;
-                console.log("Received stock update via bus:", updatedLines);
-
-                for (const updatedLine of updatedLines) {
-                    const lineIndex = this.state.summaryLines.findIndex(
-                        line => line.product_id === updatedLine.product_id
-                    );
+                this.pendingUpdates.push(notif.payload);
+            }
+        }
+        if (this.pendingUpdates.length && !this.frameRequest) {
+            this.frameRequest = requestAnimationFrame(() => this._flushUpdates());
+        }
+    }
 
-                    if (lineIndex !== -1) {
-                        // Update the existing line in place to trigger OWL's reactivity
-                        Object.assign(this.state.summaryLines[lineIndex], updatedLine);
+    _flushUpdates() {
+        // Apply everything received since the last frame in one go.
+        this.frameRequest = null;
+        const messages = this.pendingUpdates.sort((a, b) => (a.seq || 0) - (b.seq || 0));
+        this.pendingUpdates = [];
 
-                        this.notification.add(`Product '${updatedLine.template_name}' was updated.`, { type: 'info' });
-                    }
+        let missedUpdates = false;
+        let updatedCount = 0;
+        for (const message of messages) {
+            if (message.seq) {
+                if (message.seq <= this.lastSeq) {
+                    continue;
+                }
+                if (this.lastSeq && message.seq > this.lastSeq + 1) {
+                    missedUpdates = true;
                 }
+                this.lastSeq = message.seq;
+            }
+            updatedCount += this._applyUpdates(message.payload);
+        }
+
+        if (updatedCount) {
+            this.state.lastUpdate = new Date();
+            this.state.renderTick++;
+            this.notification.add(`${updatedCount} product line(s) updated.`, { type: 'info' });
+        }
+        if (missedUpdates) {
+            this.resync();
+        }
+    }
+
+    _applyUpdates(updatedLines) {
+        let updatedCount = 0;
+        for (const updatedLine of updatedLines) {
+            // Lines of pages not loaded yet are picked up when their page loads.
+            const line = this.rowIndex.get(updatedLine.product_id);
+            if (line) {
+                Object.assign(line, updatedLine);
+                updatedCount++;
             }
         }
+        return updatedCount;
     }
 }
 
@@ -88,4 +252,4 @@ OrderSummaryPopup.template = "order_summary_api.OrderSummaryPopup";
 
 // To make this component usable, you could register it as an action
 // or use it within another existing component (e.g., a dialog).
-registry.category("actions").add("order_summary_api.popup_action", OrderSummaryPopup);
\ No newline at end of file
+registry.category("actions").add("order_summary_api.popup_action", OrderSummaryPopup);
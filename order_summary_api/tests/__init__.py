@@ -0,0 +1,7 @@
+# order_summary_api/tests/__init__.py
+from . import test_benchmark
+from . import test_benchmark_http
+from . import test_order_summary_daily
+from . import test_order_summary_line
+from . import test_refresh_token
+from . import test_summary_websocket
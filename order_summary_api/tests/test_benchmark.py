@@ -0,0 +1,20 @@
+# order_summary_api/tests/test_benchmark.py
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.order_summary_api.models.benchmark import _percentile
+
+
+@tagged('post_install', '-at_install')
+class TestBenchmarkPercentile(TransactionCase):
+
+    def test_nearest_rank(self):
+        self.assertEqual(_percentile(list(range(1, 11)), 50), 5)
+        self.assertEqual(_percentile(list(range(1, 11)), 95), 10)
+        values = list(range(1, 101))
+        self.assertEqual(_percentile(values, 50), 50)
+        self.assertEqual(_percentile(values, 95), 95)
+        self.assertEqual(_percentile(values, 99), 99)
+        self.assertEqual(_percentile(values, 100), 100)
+        self.assertEqual(_percentile(values, 0), 1)
+        self.assertEqual(_percentile([7], 99), 7)
+        self.assertEqual(_percentile([], 50), 0.0)
@@ -0,0 +1,43 @@
+# order_summary_api/tests/test_benchmark_http.py
+import json
+import logging
+
+from odoo.tests import HttpCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('-standard', '-at_install', 'post_install', 'order_summary_benchmark')
+class TestOrderSummaryHttpBenchmark(HttpCase):
+    """
+    Runs the benchmark suite with its HTTP phases against the test server.
+
+    Not part of the standard test run; start it explicitly, on a throwaway
+    database, with ``--test-tags order_summary_benchmark``. The runs are
+    rolled back with the test, so their results are logged.
+    """
+    DATASET_SIZES = (1000, 10000)
+    ITERATIONS = 10
+
+    def test_benchmark(self):
+        self.env['ir.config_parameter'].sudo().set_param(
+            'order_summary_api.jwt_keys', json.dumps({'benchmark': 'order-summary-benchmark-secret'}))
+        self.env['ir.config_parameter'].sudo().set_param('order_summary_api.jwt_active_kid', 'benchmark')
+
+        def http_get(path, headers):
+            response = self.url_open(path, headers=headers, timeout=120)
+            return response.status_code, response.content
+
+        runs = self.env['order.summary.benchmark'].run_benchmark(
+            dataset_sizes=self.DATASET_SIZES, iterations=self.ITERATIONS, http_get=http_get,
+        )
+        for run in runs:
+            phases = run.result_ids.mapped('phase')
+            self.assertIn('http', phases)
+            self.assertIn('http_cached', phases)
+            for result in run.result_ids:
+                _logger.info(
+                    "%s products, %s: p50 %.2f ms, p95 %.2f ms, p99 %.2f ms, %s rows, %s bytes",
+                    run.dataset_size, result.phase, result.p50_ms, result.p95_ms, result.p99_ms,
+                    result.rows, result.payload_bytes,
+                )
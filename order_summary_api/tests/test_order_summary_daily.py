@@ -0,0 +1,71 @@
+# order_summary_api/tests/test_order_summary_daily.py
+from datetime import datetime, time, timedelta
+
+from odoo import Command, fields
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestOrderSummaryDaily(TransactionCase):
+    """Closed days are rolled up once, and again whenever their documents change."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.daily = cls.env['order.summary.daily']
+        cls.partner = cls.env['res.partner'].create({'name': 'Order Summary Customer'})
+        cls.product = cls.env['product.product'].create({'name': 'Order Summary Daily Product', 'type': 'consu'})
+        cls.today = fields.Date.today()
+
+    def _create_order(self, day, qty):
+        return self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'date_order': datetime.combine(day, time(12)),
+            'order_line': [Command.create({'product_id': self.product.id, 'product_uom_qty': qty})],
+        })
+
+    def _rolled_up_qty(self, day):
+        self.env.flush_all()
+        return sum(self.daily.search([('date', '=', day), ('product_id', '=', self.product.id)]).mapped('ordered_qty'))
+
+    def _range_qty(self, day):
+        self.env.flush_all()
+        query, params = self.daily._range_query(day, day)
+        self.env.cr.execute(query, params)
+        return sum(row[1] for row in self.env.cr.fetchall() if row[0] == self.product.id)
+
+    def test_open_days_are_not_rolled_up(self):
+        yesterday = self.today - timedelta(days=1)
+        self._create_order(yesterday, 4)
+        self.daily._rollup()
+        self.assertEqual(self.daily._get_rollup_date(), yesterday)
+        self.assertEqual(self._rolled_up_qty(yesterday), 0)
+        self.assertEqual(self._range_qty(yesterday), 4)
+
+    def test_dirty_day_rolled_up_again(self):
+        day = self.today - timedelta(days=3)
+        order = self._create_order(day, 5)
+        self.daily._rollup()
+        self.assertEqual(self._rolled_up_qty(day), 5)
+        self.assertNotIn(day, self.daily._get_dirty_dates())
+
+        order.order_line.product_uom_qty = 8
+        self.assertIn(day, self.daily._get_dirty_dates())
+        # Until the next rollup, the changed day is read live.
+        self.assertEqual(self._rolled_up_qty(day), 5)
+        self.assertEqual(self._range_qty(day), 8)
+
+        self.daily._rollup()
+        self.assertEqual(self._rolled_up_qty(day), 8)
+        self.assertNotIn(day, self.daily._get_dirty_dates())
+        self.assertEqual(self._range_qty(day), 8)
+
+    def test_marks_of_open_days_are_kept(self):
+        yesterday = self.today - timedelta(days=1)
+        order = self._create_order(yesterday, 2)
+        self.daily._rollup()
+        order.order_line.product_uom_qty = 3
+        self.daily._rollup()
+        # Yesterday is still open: its mark waits for the run that closes it.
+        self.assertIn(yesterday, self.daily._get_dirty_dates())
+        self.assertEqual(self._range_qty(yesterday), 3)
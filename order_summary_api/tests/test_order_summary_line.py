@@ -0,0 +1,160 @@
+# order_summary_api/tests/test_order_summary_line.py
+from unittest.mock import patch
+
+from odoo import Command
+from odoo.tests import Form, TransactionCase, tagged
+
+from odoo.addons.order_summary_api.tools import OrderSummaryWebSocket
+
+
+@tagged('post_install', '-at_install')
+class TestOrderSummaryLine(TransactionCase):
+    """The incrementally maintained summary matches a full recompute after every change."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.summary = cls.env['order.summary.line']
+        cls.partner = cls.env['res.partner'].create({'name': 'Order Summary Customer'})
+        cls.product_a, cls.product_b = cls.env['product.product'].create([
+            {'name': 'Order Summary Product A', 'type': 'consu'},
+            {'name': 'Order Summary Product B', 'type': 'consu'},
+        ])
+        cls.summary.rebuild()
+
+    def _quantities(self, product):
+        line = self.summary.search([('product_id', '=', product.id)])
+        return line.ordered_qty, line.manufactured_qty, line.delivered_qty
+
+    def assertSummaryInSync(self):
+        self.assertEqual(self.summary.verify(), [])
+
+    def _create_order(self, lines):
+        return self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [
+                Command.create({'product_id': product.id, 'product_uom_qty': qty}) for product, qty in lines
+            ],
+        })
+
+    def test_sale_order_lines(self):
+        order = self._create_order([(self.product_a, 5), (self.product_b, 2)])
+        self.assertEqual(self._quantities(self.product_a), (5, 0, 0))
+        self.assertSummaryInSync()
+
+        line_a, line_b = order.order_line
+        line_a.product_uom_qty = 7
+        line_b.product_id = self.product_a
+        self.assertEqual(self._quantities(self.product_a), (9, 0, 0))
+        self.assertEqual(self._quantities(self.product_b), (0, 0, 0))
+        self.assertSummaryInSync()
+
+        line_b.unlink()
+        self.assertEqual(self._quantities(self.product_a), (7, 0, 0))
+        self.assertSummaryInSync()
+
+    def test_sale_order_unlink(self):
+        order = self._create_order([(self.product_a, 4), (self.product_b, 1)])
+        order.unlink()
+        self.assertEqual(self._quantities(self.product_a), (0, 0, 0))
+        self.assertEqual(self._quantities(self.product_b), (0, 0, 0))
+        self.assertSummaryInSync()
+
+    def test_packaging_quantity(self):
+        packaging = self.env['product.packaging'].create({
+            'name': 'Box of 6', 'product_id': self.product_a.id, 'qty': 6,
+        })
+        order = self._create_order([(self.product_a, 6)])
+        line = order.order_line
+        line.write({'product_packaging_id': packaging.id, 'product_packaging_qty': 2})
+        self.assertEqual(line.product_uom_qty, 12)
+        self.assertEqual(self._quantities(self.product_a), (12, 0, 0))
+        self.assertSummaryInSync()
+
+        line.product_packaging_qty = 3
+        self.assertEqual(self._quantities(self.product_a), (18, 0, 0))
+        self.assertSummaryInSync()
+
+    def test_manufacturing_order(self):
+        production = self.env['mrp.production'].create({'product_id': self.product_a.id, 'product_qty': 3})
+        production.action_confirm()
+        self.assertSummaryInSync()
+
+        with Form(production) as production_form:
+            production_form.qty_producing = 3
+        production.button_mark_done()
+        self.assertEqual(production.state, 'done')
+        self.assertEqual(self._quantities(self.product_a), (0, 3, 0))
+        self.assertSummaryInSync()
+
+    def test_delivery(self):
+        picking_type = self.env.ref('stock.picking_type_out')
+        customers = self.env.ref('stock.stock_location_customers')
+        picking = self.env['stock.picking'].create({
+            'partner_id': self.partner.id,
+            'picking_type_id': picking_type.id,
+            'location_id': picking_type.default_location_src_id.id,
+            'location_dest_id': customers.id,
+            'move_ids': [Command.create({
+                'name': self.product_b.name,
+                'product_id': self.product_b.id,
+                'product_uom_qty': 2,
+                'location_id': picking_type.default_location_src_id.id,
+                'location_dest_id': customers.id,
+            })],
+        })
+        picking.action_confirm()
+        picking.move_ids.write({'quantity': 2, 'picked': True})
+        self.assertSummaryInSync()
+
+        picking.button_validate()
+        self.assertEqual(picking.state, 'done')
+        self.assertEqual(self._quantities(self.product_b), (0, 0, 2))
+        self.assertSummaryInSync()
+        # The real-time update names the delivery, for delivery subscriptions.
+        deliveries = self.env.cr.postcommit.data['order_summary_api.changed_deliveries']
+        self.assertIn(picking.id, deliveries[self.product_b.id])
+
+    def assertBumpsVersion(self, write):
+        postcommit = self.env.cr.postcommit.data
+        postcommit.pop('order_summary_api.version_bump', None)
+        write()
+        self.assertTrue(postcommit.get('order_summary_api.version_bump'))
+
+    def test_category_changes_bump_version(self):
+        category = self.env['product.category'].create({'name': 'Order Summary Category'})
+        template = self.product_a.product_tmpl_id
+        self.assertBumpsVersion(lambda: template.write({'categ_id': category.id}))
+        self.assertBumpsVersion(lambda: category.write({'name': 'Order Summary Category (renamed)'}))
+        self.assertBumpsVersion(lambda: category.write({'parent_id': self.env.ref('product.product_category_all').id}))
+
+    def test_count_batch_rows(self):
+        template_a = self.product_a.product_tmpl_id
+        filter_sets = {
+            'a': ([template_a.id], []),
+            'a_twice': ([template_a.id, template_a.id], []),
+            'everything': ([], []),
+        }
+        results = self.summary._read_batch_summary(filter_sets)
+        self.assertEqual(self.summary._count_batch_rows(filter_sets), sum(len(rows) for rows in results.values()))
+        self.assertEqual([row['product_id'] for row in results['a']], self.product_a.ids)
+        self.assertEqual(results['a_twice'], results['a'])
+        self.assertIn(self.product_b.id, [row['product_id'] for row in results['everything']])
+
+    def test_websocket_update_sent_after_commit(self):
+        self._create_order([(self.product_a, 1)])
+        with patch.object(OrderSummaryWebSocket, 'broadcast_update') as broadcast_update:
+            self.summary._broadcast_summary({self.product_a.id: ['ordered_qty']})
+            # The seq stamp is not committed yet: clients must not see it.
+            broadcast_update.assert_not_called()
+        line = self.summary.search([('product_id', '=', self.product_a.id)])
+        self.assertEqual(line.seq, self.summary._get_update_seq())
+
+    def test_grouped_summary_total(self):
+        self._create_order([(self.product_a, 2), (self.product_b, 3)])
+        total_rows = self.summary._read_grouped_summary(['total'])
+        self.assertEqual(len(total_rows), 1)
+        self.assertEqual(total_rows[0]['group'], 'total')
+        rows = self.summary._read_grouped_summary(['template', 'total'])
+        self.assertEqual([row['group'] for row in rows][-1], 'total')
+        self.assertEqual(rows[-1]['ordered_quantity'], total_rows[0]['ordered_quantity'])
@@ -0,0 +1,92 @@
+# order_summary_api/tests/test_refresh_token.py
+from datetime import timedelta
+
+from odoo import fields
+from odoo.exceptions import AccessDenied
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.order_summary_api.models.refresh_token import _hash_token
+
+
+@tagged('post_install', '-at_install')
+class TestRefreshToken(TransactionCase):
+    """Refresh tokens are single use, expire, and compromise their whole family when replayed."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tokens = cls.env['order.summary.refresh.token']
+        cls.user = cls.env['res.users'].create({'name': 'Order Summary API User', 'login': 'order_summary_api_user'})
+
+    def _record(self, raw_token):
+        return self.tokens.search([('token_hash', '=', _hash_token(raw_token))])
+
+    def test_only_digest_stored(self):
+        raw_token = self.tokens._issue(self.user.id)
+        self.assertFalse(self.tokens.search([('token_hash', '=', raw_token)]))
+        self.assertEqual(self._record(raw_token).user_id, self.user)
+
+    def test_rotation(self):
+        raw_token = self.tokens._issue(self.user.id)
+        user, new_token = self.tokens._rotate(raw_token)
+        self.assertEqual(user, self.user)
+        self.assertNotEqual(new_token, raw_token)
+        self.assertTrue(self._record(raw_token).revoked)
+        self.assertFalse(self._record(new_token).revoked)
+        self.assertEqual(self._record(new_token).family, self._record(raw_token).family)
+        # The successor is itself rotatable.
+        self.assertEqual(self.tokens._rotate(new_token)[0], self.user)
+
+    def test_replay_revokes_family(self):
+        raw_token = self.tokens._issue(self.user.id)
+        _user, new_token = self.tokens._rotate(raw_token)
+        other_login = self.tokens._issue(self.user.id)
+        # Not assertRaises, whose savepoint would roll the revocation back:
+        # the controller answers 401 and commits it.
+        try:
+            self.tokens._rotate(raw_token)
+        except AccessDenied:
+            pass
+        else:
+            self.fail("A replayed refresh token was accepted")
+        self.assertTrue(self._record(new_token).revoked)
+        with self.assertRaises(AccessDenied):
+            self.tokens._rotate(new_token)
+        # Other logins of the same user are untouched.
+        self.assertFalse(self._record(other_login).revoked)
+
+    def test_unknown_token(self):
+        with self.assertRaises(AccessDenied):
+            self.tokens._rotate('not-a-token')
+
+    def test_expired_token(self):
+        raw_token = self.tokens._issue(self.user.id)
+        self._record(raw_token).expires_at = fields.Datetime.now() - timedelta(seconds=1)
+        with self.assertRaises(AccessDenied):
+            self.tokens._rotate(raw_token)
+
+    def test_inactive_user(self):
+        raw_token = self.tokens._issue(self.user.id)
+        self.user.active = False
+        with self.assertRaises(AccessDenied):
+            self.tokens._rotate(raw_token)
+
+    def test_revoke(self):
+        raw_token = self.tokens._issue(self.user.id)
+        _user, new_token = self.tokens._rotate(raw_token)
+        self.assertTrue(self.tokens._revoke(new_token))
+        with self.assertRaises(AccessDenied):
+            self.tokens._rotate(new_token)
+        self.assertFalse(self.tokens._revoke('not-a-token'))
+
+    def test_gc(self):
+        expired = self.tokens._issue(self.user.id)
+        revoked = self.tokens._issue(self.user.id)
+        valid = self.tokens._issue(self.user.id)
+        self._record(expired).expires_at = fields.Datetime.now() - timedelta(days=1)
+        self.tokens._revoke(revoked)
+        self.tokens._cron_gc()
+        self.assertFalse(self._record(expired))
+        # Revoked tokens stay until they expire, so a replay still revokes its family.
+        self.assertTrue(self._record(revoked))
+        self.assertTrue(self._record(valid))
@@ -0,0 +1,56 @@
+# order_summary_api/tests/test_summary_websocket.py
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.order_summary_api.tools import summary_websocket
+from odoo.addons.order_summary_api.tools.summary_websocket import OrderSummaryDispatcher, OrderSummaryWebSocket
+
+
+class _StopElection(Exception):
+    pass
+
+
+@tagged('post_install', '-at_install')
+class TestOrderSummaryDispatcher(TransactionCase):
+    """A process losing the dispatcher lock stops its WebSocket server before running again."""
+
+    def test_leadership_loss_and_reelection(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (True,)
+
+        @contextmanager
+        def listen_cursor():
+            yield cursor
+
+        connection = MagicMock()
+        connection.cursor.side_effect = listen_cursor
+        events = []
+
+        def start():
+            events.append('start')
+            self.assertTrue(OrderSummaryDispatcher.is_leader)
+
+        def stop():
+            events.append('stop')
+            # Leadership is given up before the server goes.
+            self.assertFalse(OrderSummaryDispatcher.is_leader)
+
+        def sleep(_seconds):
+            events.append('sleep')
+            if events.count('sleep') == 2:
+                raise _StopElection()
+
+        with patch.object(summary_websocket.sql_db, 'db_connect', return_value=connection), \
+                patch.object(summary_websocket.select, 'select', side_effect=OSError("connection lost")), \
+                patch.object(summary_websocket.time, 'sleep', side_effect=sleep), \
+                patch.object(OrderSummaryWebSocket, 'start_websocket_server', side_effect=start), \
+                patch.object(OrderSummaryWebSocket, 'stop_websocket_server', side_effect=stop), \
+                patch.object(OrderSummaryDispatcher, 'is_leader', False), \
+                patch.object(OrderSummaryDispatcher, '_server_started', False):
+            with self.assertRaises(_StopElection), self.assertLogs(summary_websocket._logger.name, 'ERROR'):
+                OrderSummaryDispatcher._run()
+            self.assertEqual(events, ['start', 'stop', 'sleep', 'start', 'stop', 'sleep'])
+            self.assertFalse(OrderSummaryDispatcher.is_leader)
+            self.assertFalse(OrderSummaryDispatcher._server_started)
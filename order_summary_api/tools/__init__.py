@@ -0,0 +1,9 @@
+# order_summary_api/tools/__init__.py
+from .jwt_verifier import LEGACY_JWT_KID, JWTVerifier, jwt_verifier
+from .summary_broadcaster import NOTIFY_CHANNEL, SummaryBroadcaster, summary_broadcaster
+from .prepared_statements import PreparedStatements, prepared_statements
+from . import summary_encoding
+from .summary_cache import SummaryResultCache, summary_cache
+from .summary_gate import SummaryBusy, SummaryGate, summary_gate
+from .summary_metrics import PhaseTimer, SummaryMetrics, summary_metrics
+from .summary_websocket import OrderSummaryDispatcher, OrderSummaryWebSocket
@@ -0,0 +1,62 @@
+# order_summary_api/tools/jwt_verifier.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+
+# Key id under which the single legacy order_summary_api.jwt_secret is served.
+LEGACY_JWT_KID = 'default'
+
+
+class JWTVerifier:
+    """
+    Verifies HS256 tokens against a set of keys identified by ``kid``, and
+    remembers the tokens it has already validated.
+
+    The cache is a bounded LRU keyed by the token digest. An entry is reused
+    until the token's ``exp`` and only while the key that signed it is still
+    configured with the same secret, so retiring or changing a key revokes
+    its tokens while adding a new one leaves the cache untouched.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, dbname, token, keys, default_kid=None):
+        """Returns the token payload or raises a jwt.InvalidTokenError subclass."""
+        cache_key = (dbname, hashlib.sha256(token.encode()).digest())
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                payload, exp, kid, secret = entry
+                if exp > now and keys.get(kid) == secret:
+                    self._entries.move_to_end(cache_key)
+                    return payload
+                del self._entries[cache_key]
+
+        kid = jwt.get_unverified_header(token).get('kid') or default_kid
+        secret = keys.get(kid)
+        if not secret:
+            raise jwt.InvalidTokenError(f"Unknown key id {kid!r}")
+        payload = jwt.decode(token, secret, algorithms=["HS256"])
+
+        exp = payload.get('exp')
+        if exp:
+            with self._lock:
+                self._entries[cache_key] = (payload, exp, kid, secret)
+                self._entries.move_to_end(cache_key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+jwt_verifier = JWTVerifier()
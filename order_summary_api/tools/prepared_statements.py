@@ -0,0 +1,67 @@
+# order_summary_api/tools/prepared_statements.py
+import hashlib
+import re
+import threading
+import weakref
+from collections import OrderedDict
+
+# Prepared statements kept per database connection; the least recently used
+# ones are deallocated beyond that.
+MAX_STATEMENTS_PER_CONNECTION = 32
+
+_PLACEHOLDER = re.compile(r'%\((\w+)\)s')
+
+
+def _to_parameter(value):
+    """Passes lists as array literals, which Postgres parses much faster than ARRAY[...] expressions."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return '{' + ','.join(str(item) for item in value) + '}'
+    return value
+
+
+class PreparedStatements:
+    """
+    Prepares the summary reads once per database connection and runs them
+    through EXECUTE afterwards, so Postgres parses and plans each query shape
+    once per connection instead of once per request.
+
+    Queries use named ``%(name)s`` placeholders, as everywhere else; they
+    are turned into positional ``$n`` parameters of a statement named after
+    the hash of the query text. Prepared statements live in the database
+    session, outside of transactions, so they are tracked per connection
+    object and dropped with it.
+    """
+
+    def __init__(self, max_statements=MAX_STATEMENTS_PER_CONNECTION):
+        self.max_statements = max_statements
+        self._prepared = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def prepare(self, cr, query, params):
+        """
+        Returns the (sql, args) executing ``query`` with ``params`` through a
+        statement prepared on the connection of ``cr``, preparing it first
+        if needed.
+        """
+        names = list(OrderedDict.fromkeys(_PLACEHOLDER.findall(query)))
+        statement = 'order_summary_' + hashlib.sha1(query.encode()).hexdigest()[:20]
+        connection = cr._cnx
+        with self._lock:
+            statements = self._prepared.setdefault(connection, OrderedDict())
+            prepared = statement in statements
+            if prepared:
+                statements.move_to_end(statement)
+        if not prepared:
+            positions = {name: index for index, name in enumerate(names, 1)}
+            text = _PLACEHOLDER.sub(lambda match: f'${positions[match.group(1)]}', query).replace('%%', '%')
+            cr.execute(f"PREPARE {statement} AS {text}")
+            with self._lock:
+                statements[statement] = True
+                while len(statements) > self.max_statements:
+                    evicted, _ = statements.popitem(last=False)
+                    cr.execute(f"DEALLOCATE {evicted}")
+        sql = f"EXECUTE {statement}({', '.join(['%s'] * len(names))})" if names else f"EXECUTE {statement}"
+        return sql, [_to_parameter(params[name]) for name in names]
+
+
+prepared_statements = PreparedStatements()
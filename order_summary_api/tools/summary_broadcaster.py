@@ -0,0 +1,93 @@
+# order_summary_api/tools/summary_broadcaster.py
+import logging
+import threading
+import time
+
+from .summary_metrics import summary_metrics
+
+_logger = logging.getLogger(__name__)
+
+# Postgres channel on which workers announce committed summary changes.
+NOTIFY_CHANNEL = 'order_summary_api_updates'
+
+
+class SummaryBroadcaster:
+    """
+    Coalesces summary changes committed by many transactions into one
+    broadcast per database and time window.
+
+    The dispatcher process feeds it with the changes ({product_id: changed
+    quantity columns}) that worker transactions announced after committing,
+    and the deliveries behind them ({product_id: picking ids}).
+    The first change for a database opens a window; everything that arrives
+    until it closes is merged and sent as one batched summary query and one
+    sequence-numbered message, from a background thread and in a
+    transaction of its own, so validations never wait for the broadcast.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._pending_deliveries = {}
+        self._deadlines = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def enqueue(self, dbname, changes, window, deliveries=None):
+        """Schedules ``changes`` of ``dbname`` for broadcast within ``window`` seconds."""
+        if not changes:
+            return
+        with self._condition:
+            pending = self._pending.setdefault(dbname, {})
+            pending_deliveries = self._pending_deliveries.setdefault(dbname, {})
+            if not pending:
+                self._deadlines[dbname] = time.monotonic() + window
+            for product_id, columns in changes.items():
+                pending.setdefault(product_id, set()).update(columns)
+            for product_id, picking_ids in (deliveries or {}).items():
+                pending_deliveries.setdefault(product_id, set()).update(picking_ids)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='order_summary_broadcaster', daemon=True,
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def pending_count(self):
+        """Number of product changes waiting for their broadcast window to close."""
+        with self._condition:
+            return sum(len(pending) for pending in self._pending.values())
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._deadlines:
+                    self._condition.wait()
+                now = time.monotonic()
+                due = [dbname for dbname, deadline in self._deadlines.items() if deadline <= now]
+                if not due:
+                    self._condition.wait(min(self._deadlines.values()) - now)
+                    continue
+                batches = []
+                for dbname in due:
+                    del self._deadlines[dbname]
+                    batches.append((dbname, self._pending.pop(dbname), self._pending_deliveries.pop(dbname, {})))
+
+            for dbname, changes, deliveries in batches:
+                try:
+                    self._flush(dbname, changes, deliveries)
+                except Exception:
+                    _logger.exception("Failed to broadcast order summary updates for %s", dbname)
+
+    def _flush(self, dbname, changes, deliveries):
+        from odoo import api, SUPERUSER_ID
+        from odoo.modules.registry import Registry
+
+        registry = Registry(dbname)
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env['order.summary.line']._broadcast_summary(changes, deliveries)
+        # Broadcasts only run in the elected dispatcher, which owns the gauges.
+        summary_metrics.maybe_flush(registry, gauges=True)
+
+
+summary_broadcaster = SummaryBroadcaster()
@@ -0,0 +1,75 @@
+# order_summary_api/tools/summary_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class SummaryResultCache:
+    """
+    Process-local LRU cache of serialized order summary responses.
+
+    Entries are keyed by the normalized request (database, filters, page) and
+    tagged with the summary version they were computed at. A lookup with a
+    newer version is a miss and drops the stale entry, so bumping the version
+    invalidates everything without having to walk the cache.
+
+    Each worker process holds its own cache, so the memory used is
+    ``max_bytes`` times the number of workers.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(dbname, product_template_ids=None, delivery_ids=None, **options):
+        """Normalizes a request so that equivalent filter sets share one entry."""
+        return (
+            dbname,
+            tuple(sorted(set(product_template_ids or ()))),
+            tuple(sorted(set(delivery_ids or ()))),
+            tuple(sorted(options.items())),
+        )
+
+    @staticmethod
+    def make_etag(version, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        return f"{version}-{digest}"
+
+    def get(self, key, version):
+        """Returns the cached (body, headers) for ``key`` at ``version``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, key, version, body, headers=None):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (version, body, dict(headers or {}))
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+
+summary_cache = SummaryResultCache()
@@ -0,0 +1,79 @@
+# order_summary_api/tools/summary_encoding.py
+import gzip
+import json
+
+# Both are optional: without them the corresponding representation is simply
+# not offered during content negotiation.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'msgpack': 'application/x-msgpack',
+}
+# Media types clients may ask for in their Accept header.
+ACCEPTED_MEDIA_TYPES = {
+    'application/json': 'json',
+    'application/x-msgpack': 'msgpack',
+    'application/msgpack': 'msgpack',
+    'application/vnd.msgpack': 'msgpack',
+}
+# 'rows' is a list of objects, 'columns' one array per field.
+LAYOUTS = ('rows', 'columns')
+# Bodies smaller than this are sent uncompressed.
+MIN_COMPRESS_SIZE = 1024
+# Moderate levels: large summaries are compressed once per summary version
+# and then served from the response cache.
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+
+def available_formats():
+    return [name for name in MEDIA_TYPES if name != 'msgpack' or msgpack]
+
+
+def negotiate_format(accept_mimetypes):
+    """Returns the format best matching a werkzeug MIMEAccept, JSON by default."""
+    candidates = [media_type for media_type, name in ACCEPTED_MEDIA_TYPES.items() if name in available_formats()]
+    best = accept_mimetypes.best_match(candidates)
+    return ACCEPTED_MEDIA_TYPES[best] if best else 'json'
+
+
+def negotiate_encoding(accept_encodings):
+    """Returns 'br', 'gzip' or None (identity) for a werkzeug Accept-Encoding header."""
+    candidates = ['br', 'gzip'] if brotli else ['gzip']
+    return accept_encodings.best_match(candidates)
+
+
+def to_columns(rows):
+    """Turns a list of row dicts into one list of values per field."""
+    if not rows:
+        return {}
+    return {column: [row[column] for row in rows] for column in rows[0]}
+
+
+def encode(data, output_format='json', layout='rows'):
+    """Serializes summary rows in ``output_format`` and ``layout``."""
+    if layout == 'columns':
+        data = to_columns(data)
+    # Quantities are read as floats already; ``default`` only guards
+    # against numeric values from other sources.
+    if output_format == 'msgpack':
+        return msgpack.packb(data, use_bin_type=True, default=float)
+    return json.dumps(data, separators=(',', ':'), default=float).encode()
+
+
+def compress(body, encoding):
+    """Returns (body, applied encoding); small bodies are left as they are."""
+    if not encoding or len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY), encoding
+    return gzip.compress(body, compresslevel=GZIP_LEVEL), 'gzip'
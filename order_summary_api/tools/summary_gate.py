@@ -0,0 +1,199 @@
+# order_summary_api/tools/summary_gate.py
+import hashlib
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from psycopg2 import errors
+
+_logger = logging.getLogger(__name__)
+
+# Classes (first key of the two-key form) of the advisory locks taken here.
+COALESCE_LOCK_CLASS = 0x4F534301
+ADMISSION_LOCK_CLASS = 0x4F534302
+# Held in shared mode by the workers waiting for a coalesced execution, so
+# it only publishes its result when someone will read it.
+WAITER_LOCK_CLASS = 0x4F534303
+# Defaults of the order_summary_api.max_heavy_queries and
+# order_summary_api.queue_timeout_ms system parameters.
+DEFAULT_MAX_HEAVY_QUERIES = 4
+DEFAULT_QUEUE_TIMEOUT_MS = 10000
+# Delay between two attempts at getting an execution slot, in seconds.
+ADMISSION_POLL_INTERVAL = 0.05
+# Shared results are only needed by the requests waiting on them; older
+# ones are purged by the next execution.
+SHARED_RESULT_TTL = 300
+
+
+class SummaryBusy(Exception):
+    """Raised when a summary query could not start within the queue timeout."""
+
+
+class _Flight:
+    """One in-flight execution, awaited by the identical requests of this process."""
+
+    __slots__ = ('done', 'result')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SummaryGate:
+    """
+    Request coalescing and admission control for summary queries.
+
+    Identical requests (same normalized cache key, same summary version)
+    share one execution. Within a process, threads wait for the first one.
+    Light queries stop there: running them again is cheaper than
+    coordinating with other workers.
+
+    Heavy queries are also coalesced across worker processes. The executing
+    request holds a transaction-level advisory lock on the key; the other
+    workers register as waiters and block on it. If any did, the result is
+    published in the unlogged order_summary_shared_result table in the same
+    transaction, so they pick it up as soon as the lock is released.
+
+    Heavy queries additionally need one of ``max_heavy`` execution slots,
+    also advisory locks, and give up with SummaryBusy after
+    ``queue_timeout`` seconds. The slot is taken on the cursor holding the
+    coalescing lock, which is also the one the query reads through, so an
+    execution uses one connection besides the request's own.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def run(self, registry, key, version, compute, heavy=False,
+            max_heavy=DEFAULT_MAX_HEAVY_QUERIES, queue_timeout=DEFAULT_QUEUE_TIMEOUT_MS / 1000.0):
+        """
+        Returns the (body, headers) computed by ``compute(cr)`` for ``key``
+        at ``version``, or the result of an identical request in flight.
+
+        ``cr`` is a cursor of its own, whose snapshot is taken after this
+        call starts. The caller reads ``version`` before, so the result
+        includes every change that version was bumped for.
+        """
+        flight_key = (key, version)
+        with self._lock:
+            flight = self._flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[flight_key] = _Flight()
+
+        if not leader:
+            if not flight.done.wait(queue_timeout):
+                raise SummaryBusy()
+            if flight.result is not None:
+                return flight.result
+            # The execution we waited for failed: try on our own.
+            return self._execute(registry, key, version, compute, heavy, max_heavy, queue_timeout)
+
+        try:
+            flight.result = self._execute(registry, key, version, compute, heavy, max_heavy, queue_timeout)
+            return flight.result
+        finally:
+            with self._lock:
+                self._flights.pop(flight_key, None)
+            flight.done.set()
+
+    def _execute(self, registry, key, version, compute, heavy, max_heavy, queue_timeout):
+        if not heavy:
+            with registry.cursor() as cr:
+                return compute(cr)
+        return self._run_shared(registry, key, version, compute, max_heavy, queue_timeout)
+
+    def _run_shared(self, registry, key, version, compute, max_heavy, queue_timeout):
+        digest = hashlib.sha1(repr(key).encode()).digest()
+        # Non-negative, so that it reads back the same from pg_locks.objid.
+        lock_key = int.from_bytes(digest[:4], 'big') & 0x7FFFFFFF
+        row = None
+        with registry.cursor() as cr:
+            cr.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", [COALESCE_LOCK_CLASS, lock_key])
+            if cr.fetchone()[0]:
+                self._acquire_slot(cr, max_heavy, queue_timeout)
+                body, headers = compute(cr)
+                cr.execute("""
+                    SELECT EXISTS (
+                        SELECT 1 FROM pg_locks
+                        WHERE locktype = 'advisory' AND classid = %s::oid AND objid = %s::oid AND objsubid = 2
+                    )
+                """, [WAITER_LOCK_CLASS, lock_key])
+                if cr.fetchone()[0]:
+                    cr.execute("DELETE FROM order_summary_shared_result "
+                               "WHERE create_date < now() - make_interval(secs => %s)", [SHARED_RESULT_TTL])
+                    cr.execute("""
+                        INSERT INTO order_summary_shared_result (key, version, body, headers)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT (key) DO UPDATE
+                        SET version = EXCLUDED.version, body = EXCLUDED.body,
+                            headers = EXCLUDED.headers, create_date = now()
+                        WHERE order_summary_shared_result.version <= EXCLUDED.version
+                    """, [digest.hex(), version, body, json.dumps(headers)])
+                # Committing publishes the result and releases the locks.
+                return body, headers
+
+            # Another worker runs the same request: register, and wait for it
+            # to commit. A waiter registering after the check above finds no
+            # result and runs the query itself.
+            cr.execute("SELECT pg_advisory_xact_lock_shared(%s, %s)", [WAITER_LOCK_CLASS, lock_key])
+            try:
+                cr.execute("SELECT set_config('lock_timeout', %s, true)", [f"{int(queue_timeout * 1000)}ms"])
+                cr.execute("SELECT pg_advisory_xact_lock(%s, %s)", [COALESCE_LOCK_CLASS, lock_key],
+                           log_exceptions=False)
+            except errors.LockNotAvailable:
+                raise SummaryBusy()
+            # Release the locks, and read in a new snapshot that sees the result.
+            cr.commit()
+            cr.execute("SELECT body, headers FROM order_summary_shared_result WHERE key = %s AND version = %s",
+                       [digest.hex(), version])
+            row = cr.fetchone()
+            if row:
+                headers = row[1] if isinstance(row[1], dict) else json.loads(row[1])
+                return bytes(row[0]), headers
+
+            # The other execution failed, or saw another summary version.
+            self._acquire_slot(cr, max_heavy, queue_timeout)
+            return compute(cr)
+
+    @contextmanager
+    def admit(self, registry, heavy=True, max_heavy=DEFAULT_MAX_HEAVY_QUERIES,
+              queue_timeout=DEFAULT_QUEUE_TIMEOUT_MS / 1000.0):
+        """
+        Holds one of the ``max_heavy`` execution slots shared by all workers
+        for the duration of the block, waiting at most ``queue_timeout``
+        seconds for one. Light queries (``heavy=False``) and a limit of 0
+        are let through.
+        """
+        if not heavy or max_heavy <= 0:
+            yield
+            return
+        with registry.cursor() as cr:
+            self._acquire_slot(cr, max_heavy, queue_timeout)
+            # Ending the transaction frees the slot.
+            yield
+
+    def _acquire_slot(self, cr, max_heavy, queue_timeout):
+        """
+        Takes one of the ``max_heavy`` execution slots in the transaction of
+        ``cr``, which holds it until it ends, or raises SummaryBusy after
+        ``queue_timeout`` seconds.
+        """
+        if max_heavy <= 0:
+            return
+        deadline = time.monotonic() + queue_timeout
+        while True:
+            for slot in range(max_heavy):
+                cr.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", [ADMISSION_LOCK_CLASS, slot])
+                if cr.fetchone()[0]:
+                    return
+            if time.monotonic() >= deadline:
+                _logger.warning("No order summary execution slot freed up within %.1fs", queue_timeout)
+                raise SummaryBusy()
+            time.sleep(ADMISSION_POLL_INTERVAL)
+
+
+summary_gate = SummaryGate()
@@ -0,0 +1,265 @@
+# order_summary_api/tools/summary_metrics.py
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+_logger = logging.getLogger(__name__)
+
+# Latency buckets, in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Minimum delay between two flushes of a process' metrics, in seconds.
+METRICS_FLUSH_INTERVAL = 10
+# Gauges not refreshed by the dispatcher for that long, in seconds, are no
+# longer reported: the process that wrote them is gone or not leading.
+GAUGE_TTL = 60
+# Order of the samples of one histogram series.
+_SAMPLE_SUFFIXES = {'_bucket': 0, '_sum': 1, '_count': 2}
+
+
+def _format_label_pairs(labels):
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+
+
+def _split_le(labels):
+    """Returns (labels but le, le): bucket bounds are stored apart, to sort on them."""
+    le = ''
+    pairs = []
+    for name, value in labels:
+        if name == 'le':
+            le = str(value)
+        else:
+            pairs.append((name, value))
+    return _format_label_pairs(pairs), le
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, lock):
+        self.name = name
+        self.documentation = documentation
+        self._lock = lock
+        self._values = {}
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, labels, value) for labels, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, lock, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, lock)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket counts (the last one is +Inf), then the sum.
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, list(counts), total) for labels, (counts, total) in self._values.items())
+        samples = []
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", labels + (('le', bound),), cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Gauge(_Metric):
+    """A value read when the metrics are rendered."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, lock, callback):
+        super().__init__(name, documentation, lock)
+        self.callback = callback
+
+    def samples(self):
+        return [(self.name, (), self.callback())]
+
+
+class SummaryMetrics:
+    """
+    Registry of the order summary metrics, rendered in the Prometheus text
+    format.
+
+    Values are recorded in process memory and flushed, at most every
+    METRICS_FLUSH_INTERVAL seconds, into the unlogged order_summary_metric
+    table of the database: counters and histograms as increments since the
+    last flush, so the table holds the totals of all worker processes.
+    Gauges describe the real-time dispatcher and are only written by the
+    process holding it, with their time of writing. The metrics are
+    rendered from that table, whatever worker answers the scrape.
+
+    Flushes go to the database of the registry they are given, so with
+    several databases a process' increments land in the database of the
+    request or broadcast that flushed them.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        # Values already written, {(sample, labels, le): value}.
+        self._flushed = {}
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def _register(self, metric_class, name, documentation, *args):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = metric_class(name, documentation, threading.Lock(), *args)
+            return self._metrics[name]
+
+    def counter(self, name, documentation):
+        return self._register(Counter, name, documentation)
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, buckets)
+
+    def gauge(self, name, documentation, callback):
+        return self._register(Gauge, name, documentation, callback)
+
+    def maybe_flush(self, registry, gauges=False):
+        """Flushes the metrics of this process if the last flush is older than METRICS_FLUSH_INTERVAL."""
+        if time.monotonic() - self._last_flush >= METRICS_FLUSH_INTERVAL:
+            self.flush(registry, gauges)
+
+    def flush(self, registry, gauges=False):
+        """
+        Adds the counter and histogram increments of this process since its
+        last flush to order_summary_metric, and overwrites the gauges when
+        ``gauges`` is set. Failures are logged: metrics never fail a request.
+        """
+        if not self._flush_lock.acquire(blocking=False):
+            return  # another thread of this process is flushing
+        try:
+            self._last_flush = time.monotonic()
+            with self._lock:
+                metrics = list(self._metrics.values())
+            values, deltas, gauge_rows = {}, [], []
+            for metric in metrics:
+                for sample, labels, value in metric.samples():
+                    key = (sample,) + _split_le(labels)
+                    if isinstance(metric, Gauge):
+                        gauge_rows.append((metric.name,) + key + (value,))
+                        continue
+                    values[key] = value
+                    delta = value - self._flushed.get(key, 0)
+                    if delta:
+                        deltas.append((metric.name,) + key + (delta,))
+            if not deltas and not gauges:
+                return
+            with registry.cursor() as cr:
+                # Sorted, so that concurrent flushes lock the rows in the same order.
+                for rows, assignment in ((sorted(deltas, key=lambda row: row[1:4]), "m.value + EXCLUDED.value"),
+                                         (sorted(gauge_rows, key=lambda row: row[1:4]) if gauges else [],
+                                          "EXCLUDED.value")):
+                    if not rows:
+                        continue
+                    cr.execute(f"""
+                        INSERT INTO order_summary_metric AS m (name, sample, labels, le, value)
+                        SELECT * FROM unnest(%s::varchar[], %s::varchar[], %s::varchar[], %s::varchar[], %s::float8[])
+                        ON CONFLICT (sample, labels, le) DO UPDATE
+                        SET value = {assignment}, update_date = now()
+                    """, [list(column) for column in zip(*rows)])
+            self._flushed.update(values)
+        except Exception:
+            _logger.warning("Could not flush the order summary metrics", exc_info=True)
+        finally:
+            self._flush_lock.release()
+
+    def render(self, cr):
+        """Renders the metrics of all processes, as stored in order_summary_metric."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        cr.execute("""
+            SELECT name, sample, labels, le, value, update_date < now() - make_interval(secs => %s)
+            FROM order_summary_metric
+        """, [GAUGE_TTL])
+        samples = {}
+        for name, sample, labels, le, value, stale in cr.fetchall():
+            metric = metrics.get(name)
+            if metric is None or (stale and isinstance(metric, Gauge)):
+                continue
+            suffix = sample[len(name):]
+            order = (labels, _SAMPLE_SUFFIXES.get(suffix, 0), float(le) if le else 0.0)
+            samples.setdefault(name, []).append((order, sample, labels, le, value))
+        lines = []
+        for name, metric in metrics.items():
+            lines += [f"# HELP {name} {metric.documentation}", f"# TYPE {name} {metric.kind}"]
+            for _order, sample, labels, le, value in sorted(samples.get(name, [])):
+                pairs = ','.join(filter(None, [labels, f'le="{le}"' if le else '']))
+                lines.append(f"{sample}{{{pairs}}} {value}" if pairs else f"{sample} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+class PhaseTimer:
+    """Durations of the phases of one request, rendered as a Server-Timing header."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ', '.join(entries)
+
+
+summary_metrics = SummaryMetrics()
+
+REQUESTS = summary_metrics.counter(
+    'order_summary_requests_total', "Order summary API requests, by endpoint and status code.")
+REQUEST_DURATION = summary_metrics.histogram(
+    'order_summary_request_duration_seconds', "Order summary API latency, by endpoint.")
+PHASE_DURATION = summary_metrics.histogram(
+    'order_summary_phase_duration_seconds', "Time spent in each phase of the order summary API requests.")
+ROWS = summary_metrics.counter(
+    'order_summary_rows_total', "Summary rows returned, by endpoint.")
+CACHE_LOOKUPS = summary_metrics.counter(
+    'order_summary_cache_lookups_total',
+    "Order summary response lookups, by result (not_modified, hit, coalesced or miss).")
+BROADCASTS = summary_metrics.counter(
+    'order_summary_broadcasts_total', "Real-time update messages broadcast.")
+BROADCAST_DURATION = summary_metrics.histogram(
+    'order_summary_broadcast_duration_seconds', "Time spent sending real-time updates, by target (bus, websocket).")
+WEBSOCKET_DROPPED = summary_metrics.counter(
+    'order_summary_websocket_dropped_clients_total', "WebSocket clients disconnected for being too slow.")
+SLOW_QUERIES = summary_metrics.counter(
+    'order_summary_slow_queries_total', "Summary queries slower than order_summary_api.slow_query_ms.")
@@ -0,0 +1,317 @@
+# order_summary_api/tools/summary_websocket.py
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+
+from websockets import serve, WebSocketServerProtocol
+
+from odoo import sql_db
+
+from .summary_broadcaster import NOTIFY_CHANNEL, summary_broadcaster
+from .summary_metrics import BROADCAST_DURATION, WEBSOCKET_DROPPED, summary_metrics
+
+_logger = logging.getLogger(__name__)
+
+# Messages buffered per client before it is considered too slow and dropped.
+CLIENT_QUEUE_SIZE = 100
+
+
+class _ClientState:
+    """Subscription and outgoing queue of one connected WebSocket client."""
+
+    __slots__ = ('queue', 'delivery_ids', 'product_ids', 'writer')
+
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.delivery_ids = set()
+        self.product_ids = set()
+        self.writer = None
+
+    def matches(self, delivery_ids, product_ids):
+        """Clients without a subscription get everything."""
+        if not self.delivery_ids and not self.product_ids:
+            return True
+        return bool(self.delivery_ids & delivery_ids or self.product_ids & product_ids)
+
+
+class OrderSummaryWebSocket:
+    """WebSocket Manager for Real-time Updates"""
+
+    # websocket -> _ClientState; only touched from the server's event loop.
+    _connected_clients = {}
+    _loop = None
+    _server = None
+    _thread = None
+    # Seconds to wait for the server to bind its port, or to stop.
+    SERVER_START_TIMEOUT = 10
+
+    @classmethod
+    def broadcast_update(cls, message, delivery_ids=None, product_ids=None):
+        """
+        Broadcast update to the subscribed clients. Thread-safe: the message
+        is serialized once here and the fan-out runs on the server loop.
+        """
+        loop = cls._loop
+        if loop is None or loop.is_closed():
+            return
+        if delivery_ids is None:
+            delivery_ids = cls._extract_ids(message, 'delivery_id', 'delivery_ids')
+        if product_ids is None:
+            product_ids = cls._extract_ids(message, 'product_id', 'product_ids')
+        data = json.dumps(message, default=str)
+        loop.call_soon_threadsafe(cls._fan_out, data, set(delivery_ids), set(product_ids))
+
+    @staticmethod
+    def _extract_ids(message, single_key, list_key):
+        ids = set(message.get(list_key) or [])
+        if message.get(single_key):
+            ids.add(message[single_key])
+        payload = message.get('payload')
+        if isinstance(payload, list):
+            for row in payload:
+                if not isinstance(row, dict):
+                    continue
+                if row.get(single_key):
+                    ids.add(row[single_key])
+                ids.update(row.get(list_key) or [])
+        return ids
+
+    @classmethod
+    def _fan_out(cls, data, delivery_ids, product_ids):
+        """Queues ``data`` for every matching client; runs on the server loop."""
+        start = time.perf_counter()
+        for websocket, client in list(cls._connected_clients.items()):
+            if not client.matches(delivery_ids, product_ids):
+                continue
+            try:
+                client.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                _logger.warning("Disconnecting slow WebSocket client %s", websocket.remote_address)
+                WEBSOCKET_DROPPED.inc()
+                cls._connected_clients.pop(websocket, None)
+                client.writer.cancel()
+                asyncio.ensure_future(websocket.close(code=1013, reason='Client too slow'))
+        BROADCAST_DURATION.observe(time.perf_counter() - start, target='websocket')
+
+    @classmethod
+    def queued_messages(cls):
+        """Messages waiting in the queues of all connected clients."""
+        return sum(client.queue.qsize() for client in list(cls._connected_clients.values()))
+
+    @staticmethod
+    async def _client_writer(websocket, client):
+        """Sends queued messages to one client, independently of the others."""
+        try:
+            while True:
+                data = await client.queue.get()
+                await websocket.send(data)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            _logger.error(f"Error broadcasting to client: {e}")
+            OrderSummaryWebSocket._connected_clients.pop(websocket, None)
+
+    @staticmethod
+    async def websocket_handler(websocket: WebSocketServerProtocol, path: str = None):
+        """WebSocket handler for real-time updates"""
+        client = _ClientState()
+        client.writer = asyncio.ensure_future(OrderSummaryWebSocket._client_writer(websocket, client))
+        OrderSummaryWebSocket._connected_clients[websocket] = client
+
+        try:
+            async for message in websocket:
+                try:
+                    data = json.loads(message)
+
+                    if data.get('type') == 'subscribe':
+                        client.delivery_ids = {int(i) for i in data.get('delivery_ids') or []}
+                        client.product_ids = {int(i) for i in data.get('product_ids') or []}
+
+                        await client.queue.put(json.dumps({
+                            'type': 'subscription_confirmed',
+                            'delivery_ids': sorted(client.delivery_ids),
+                            'product_ids': sorted(client.product_ids),
+                        }))
+                except json.JSONDecodeError:
+                    _logger.error("Invalid JSON received from WebSocket client")
+                except Exception as e:
+                    _logger.error(f"Error processing WebSocket message: {e}")
+
+        except Exception as e:
+            _logger.error(f"WebSocket error: {e}")
+        finally:
+            OrderSummaryWebSocket._connected_clients.pop(websocket, None)
+            client.writer.cancel()
+
+    @classmethod
+    def start_websocket_server(cls):
+        """
+        Starts the WebSocket server in a background thread and waits until
+        it listens; raises if it could not bind its port within
+        SERVER_START_TIMEOUT seconds.
+        """
+        started = threading.Event()
+        errors = []
+
+        def run_server():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+
+            async def server_main():
+                try:
+                    server = await serve(cls.websocket_handler, "localhost", 8765)
+                except Exception as e:
+                    errors.append(e)
+                    started.set()
+                    return
+                cls._server = server
+                cls._loop = loop
+                _logger.info("WebSocket server started on port 8765")
+                started.set()
+                await server.wait_closed()
+
+            try:
+                loop.run_until_complete(server_main())
+            except Exception as e:
+                _logger.error(f"WebSocket server error: {e}")
+            finally:
+                cls._loop = None
+                cls._server = None
+                cls._connected_clients.clear()
+                loop.close()
+
+        thread = cls._thread = threading.Thread(target=run_server, name='order_summary_websocket', daemon=True)
+        thread.start()
+        if not started.wait(cls.SERVER_START_TIMEOUT) or errors:
+            raise RuntimeError(f"WebSocket server failed to start: {errors[0] if errors else 'timeout'}")
+        _logger.info("WebSocket server thread started")
+
+    @classmethod
+    def stop_websocket_server(cls):
+        """Closes the server and its client connections, and waits for its thread to end."""
+        loop, server, thread = cls._loop, cls._server, cls._thread
+        if loop is not None and server is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(server.close)
+        if thread is not None:
+            thread.join(cls.SERVER_START_TIMEOUT)
+            cls._thread = None
+        _logger.info("WebSocket server stopped")
+
+
+class OrderSummaryDispatcher:
+    """
+    Cross-worker real-time dispatcher.
+
+    Every worker NOTIFYs compact change events (changed quantity columns and
+    validated deliveries per product) on NOTIFY_CHANNEL once its transaction
+    has committed. Exactly one process of the server, the one holding
+    DISPATCHER_LOCK_KEY, LISTENs on that channel, owns the WebSocket server
+    and fans the (coalesced) updates out to bus and WebSocket subscribers,
+    whatever worker produced them.
+
+    Every process serving requests takes part in the election, from its
+    first dispatched request on (see ir.http). Nothing is started at import:
+    in prefork mode the registries may be preloaded in the master process,
+    whose threads the forked workers would not inherit.
+    """
+
+    DISPATCHER_LOCK_KEY = 0x4F534150  # 'OSAP'
+    ELECTION_RETRY_DELAY = 10
+    LISTEN_TIMEOUT = 50
+
+    is_leader = False
+    _server_started = False
+    # Process in which the election thread runs.
+    _pid = None
+    _start_lock = threading.Lock()
+
+    @classmethod
+    def ensure_started(cls):
+        """Starts the election thread in the calling process, once."""
+        if cls._pid == os.getpid():
+            return
+        with cls._start_lock:
+            if cls._pid == os.getpid():
+                return
+            cls._pid = os.getpid()
+            # State copied from a parent process is not ours.
+            cls.is_leader = False
+            cls._server_started = False
+            threading.Thread(target=cls._run, name='order_summary_dispatcher', daemon=True).start()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            try:
+                cls._listen()
+            except Exception:
+                _logger.exception("Order summary dispatcher failed, retrying")
+            cls._step_down()
+            time.sleep(cls.ELECTION_RETRY_DELAY)
+
+    @classmethod
+    def _step_down(cls):
+        """
+        Gives up what leadership came with: the WebSocket server stops, so
+        its clients reconnect to the next leader, which can bind the port.
+        """
+        cls.is_leader = False
+        if cls._server_started:
+            OrderSummaryWebSocket.stop_websocket_server()
+            cls._server_started = False
+
+    @classmethod
+    def _listen(cls):
+        # Same connection scheme as Odoo's bus: NOTIFY/LISTEN on the postgres
+        # database, with the target database name inside the payload.
+        with sql_db.db_connect('postgres').cursor() as cr:
+            cr.execute("SELECT pg_try_advisory_lock(%s)", [cls.DISPATCHER_LOCK_KEY])
+            if not cr.fetchone()[0]:
+                cr.commit()
+                return
+            # The session-level lock lives as long as this connection.
+            cr.execute(f'LISTEN "{NOTIFY_CHANNEL}"')
+            cr.commit()
+            cls.is_leader = True
+            _logger.info("Order summary dispatcher elected in this process")
+            # Stopped again by _step_down, even if it fails to start.
+            cls._server_started = True
+            OrderSummaryWebSocket.start_websocket_server()
+
+            conn = cr._cnx
+            while True:
+                if select.select([conn], [], [], cls.LISTEN_TIMEOUT) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    cls._handle_notification(conn.notifies.pop(0).payload)
+
+    @staticmethod
+    def _handle_notification(payload):
+        try:
+            event = json.loads(payload)
+            changes = {int(product_id): columns for product_id, columns in event['changes'].items()}
+            deliveries = {
+                int(product_id): picking_ids for product_id, picking_ids in (event.get('deliveries') or {}).items()
+            }
+            summary_broadcaster.enqueue(event['db'], changes, event['window'], deliveries)
+        except (ValueError, KeyError, TypeError):
+            _logger.error("Invalid order summary notification: %s", payload)
+
+
+summary_metrics.gauge(
+    'order_summary_websocket_clients', "Connected WebSocket clients.",
+    lambda: len(OrderSummaryWebSocket._connected_clients))
+summary_metrics.gauge(
+    'order_summary_websocket_queued_messages', "Messages waiting in the WebSocket client queues.",
+    OrderSummaryWebSocket.queued_messages)
+summary_metrics.gauge(
+    'order_summary_broadcast_queue_depth', "Product changes waiting for their broadcast window.",
+    summary_broadcaster.pending_count)
+summary_metrics.gauge(
+    'order_summary_dispatcher_leader', "1 while a server process is the elected real-time dispatcher.",
+    lambda: int(OrderSummaryDispatcher.is_leader))